@@ -0,0 +1,201 @@
+# sat_gemini_agent/backend/asgi.py
+#
+# Async serving mode. Run with:  uvicorn asgi:application --port 5000
+#
+# The LLM-bound endpoints below are native async handlers: they await non-blocking
+# Gemini calls, so one process can hold many requests in flight while waiting on the
+# model. Database work still uses the Flask-SQLAlchemy models and runs in the thread
+# pool inside an app context. Every other route is forwarded to the unchanged Flask
+# app, which also keeps working on its own with `python app.py`.
+import asyncio
+import contextlib
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+from app import (
+    app as flask_app,
+    gemini_service,
+    question_pool,
+    start_question_pool_worker,
+    grade_multiple_choice,
+    load_chat_user_profile,
+    record_evaluated_attempt,
+    record_image_question_attempt,
+    resolve_essay_topic,
+    save_essay_submission,
+    User,
+)
+
+
+async def run_with_app_context(func, *args, **kwargs):
+    """Runs a blocking, database-touching helper in the thread pool inside a Flask app context."""
+    def call():
+        with flask_app.app_context():
+            return func(*args, **kwargs)
+    return await run_in_threadpool(call)
+
+
+async def generate_question(request):
+    data = await request.json()
+    topic = data.get('topic')
+    difficulty = data.get('difficulty', 'medium')
+    question_type = data.get('question_type', 'multiple_choice')
+    user_id = data.get('user_id')
+
+    if not topic:
+        return JSONResponse({"error": "Topic is required"}, status_code=400)
+
+    try:
+        if question_pool:
+            pooled_questions = await run_with_app_context(question_pool.take, topic, difficulty, question_type, user_id=user_id)
+            if pooled_questions:
+                return JSONResponse({"question": pooled_questions[0]})
+
+        question_data = await gemini_service.generate_sat_question_async(topic, difficulty, question_type)
+        if "error" in question_data:
+            return JSONResponse({"error": question_data.get("error"), "details": question_data.get("details", "")}, status_code=500)
+
+        return JSONResponse({"question": question_data})
+    except Exception as e:
+        flask_app.logger.error(f"Error generating question: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def evaluate_answer(request):
+    data = await request.json()
+    question_text = data.get('question_text')
+    user_answer = data.get('user_answer')
+    correct_answer_info = data.get('correct_answer_info')
+    user_id = data.get('user_id')
+
+    if not all([question_text, user_answer, correct_answer_info]):
+        return JSONResponse({"error": "Missing required fields"}, status_code=400)
+
+    try:
+        feedback = None
+        if data.get('question_type') == 'multiple_choice':
+            feedback = grade_multiple_choice(user_answer, correct_answer_info, data.get('options'))
+
+        if feedback is None:
+            feedback = await gemini_service.evaluate_and_explain_async(
+                question=question_text,
+                user_answer=user_answer,
+                correct_answer_info=correct_answer_info
+            )
+
+        await run_with_app_context(record_evaluated_attempt, user_id, data, feedback)
+
+        return JSONResponse({"feedback": feedback})
+    except Exception as e:
+        flask_app.logger.error(f"Error evaluating answer: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def send_chat_message(request):
+    data = await request.json()
+    user_id = data.get('user_id')
+    message = data.get('message')
+
+    if not user_id or not message:
+        return JSONResponse({"error": "user_id and message are required"}, status_code=400)
+
+    try:
+        user_profile = await run_with_app_context(load_chat_user_profile, user_id)
+        response = await gemini_service.send_chat_message_async(user_id, message, user_profile)
+        return JSONResponse(response, status_code=200 if "ai_response" in response else 500)
+    except Exception as e:
+        flask_app.logger.error(f"System Error: Failed to send chat message: {e}")
+        return JSONResponse({"error": f"System Error: Failed to send chat message: {str(e)}"}, status_code=500)
+
+
+async def submit_user_essay(request):
+    user_id = request.path_params['user_id']
+    data = await request.json()
+    essay_text = data.get('essay_text')
+    essay_topic_id = data.get('essay_topic_id')
+    essay_title = data.get('essay_title')
+
+    if not essay_text:
+        return JSONResponse({"error": "essay_text is required"}, status_code=400)
+
+    user = await run_with_app_context(lambda: User.query.get(user_id))
+    if not user:
+        return JSONResponse({"error": "User not found"}, status_code=404)
+
+    topic_description, topic_title_for_submission = await run_with_app_context(resolve_essay_topic, essay_topic_id, essay_title)
+
+    try:
+        feedback_data = await gemini_service.analyze_essay_async(essay_text, topic_description)
+
+        if "error" in feedback_data:
+            flask_app.logger.error(f"Gemini essay analysis failed or returned partial data for user {user_id}. Raw: {feedback_data.get('raw_feedback_text', 'N/A')}")
+            return JSONResponse({"error": feedback_data.get("general_comments") or feedback_data.get("error") or "Essay analysis failed"}, status_code=500)
+
+        submission_id = await run_with_app_context(save_essay_submission, user_id, essay_topic_id, topic_title_for_submission, essay_text, feedback_data)
+
+        return JSONResponse({
+            "submission_id": submission_id,
+            "feedback": feedback_data
+        }, status_code=201)
+    except Exception as e:
+        flask_app.logger.error(f"Error submitting essay for user {user_id}: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def upload_image_question(request):
+    data = await request.json()
+    image_data_urls = data.get('imageDataUrls')
+    user_prompt_text = data.get('userPromptText')
+    user_id = data.get('user_id')
+
+    if not image_data_urls or not isinstance(image_data_urls, list) or not user_prompt_text:
+        return JSONResponse({"error": "An array of image data URLs and user prompt text are required"}, status_code=400)
+
+    # All images are analyzed concurrently; results keep the order of imageDataUrls
+    ai_responses = await asyncio.gather(
+        *(gemini_service.analyze_image_question_async(image_data_url, user_prompt_text) for image_data_url in image_data_urls)
+    )
+
+    all_ai_responses = []
+    for image_data_url, ai_response_json in zip(image_data_urls, ai_responses):
+        if "error" in ai_response_json:
+            flask_app.logger.error(f"Error analyzing one image: {ai_response_json.get('error')} - {ai_response_json.get('details')}")
+            all_ai_responses.append({"error": "Failed to analyze this image", "details": ai_response_json.get("details", "")})
+            continue
+
+        try:
+            await run_with_app_context(record_image_question_attempt, user_id, image_data_url, user_prompt_text, ai_response_json)
+            all_ai_responses.append(ai_response_json)
+        except Exception as e:
+            flask_app.logger.error(f"Error processing image in loop: {e}")
+            all_ai_responses.append({"error": "An unexpected error occurred for this image", "details": str(e)})
+
+    if not all_ai_responses:
+        return JSONResponse({"error": "No images were successfully analyzed."}, status_code=500)
+
+    return JSONResponse({"message": "Images analyzed successfully!", "aiResponses": all_ai_responses})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    start_question_pool_worker()
+    yield
+
+
+application = Starlette(
+    lifespan=lifespan,
+    routes=[
+        Route('/generate_question', generate_question, methods=['POST']),
+        Route('/evaluate_answer', evaluate_answer, methods=['POST']),
+        Route('/chat/send_message', send_chat_message, methods=['POST']),
+        Route('/user/{user_id:int}/essays/submit', submit_user_essay, methods=['POST']),
+        Route('/upload_image_question', upload_image_question, methods=['POST']),
+        Mount('/', app=WsgiToAsgi(flask_app)),
+    ],
+    # Same open CORS policy as flask_cors in app.py, applied to the async routes too
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])]
+)
@@ -0,0 +1,65 @@
+# backend/bench/chat_rewind_check.py
+#
+# Checks that a failed or abandoned streaming chat turn leaves the earlier conversation
+# intact. Runs GeminiService against the fake Gemini model, whose ChatSession.rewind()
+# follows the real one: with no exchange pending it pops the last two history entries.
+# Run from the backend directory; exits non-zero if a check fails:
+#
+#   python -m bench.chat_rewind_check
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_gemini import FakeConfig, install  # noqa: E402
+
+USER_ID = 1
+PROFILE = {"learning_goals": ["raise my math score"], "current_knowledge_level": {"Algebra": "beginner"}}
+
+
+def history_texts(service):
+    return [part.text for content in service._get_chat_session(USER_ID)["chat"].history for part in content.parts]
+
+
+def main():
+    config = install(FakeConfig(latency_median_seconds=0.0, latency_sigma=0.0, stream_chunks=4, seed=0))
+    from services.gemini_service import GeminiService
+    from services.resilience import ResilientCaller
+
+    service = GeminiService(api_key="fake", resilience=ResilientCaller(max_attempts=1))
+    service.start_chat_session(USER_ID, PROFILE)
+    service.send_chat_message(USER_ID, "How do I solve 3x + 5 = 20?", PROFILE)
+    before = history_texts(service)
+
+    failures = []
+
+    # send_message fails before any chunk arrives: nothing was recorded, so nothing is rewound
+    config.failure_rate = 1.0
+    events = list(service.stream_chat_message(USER_ID, "And 2x - 4 = 10?", PROFILE))
+    config.failure_rate = 0.0
+    if "error" not in events[-1]:
+        failures.append(f"failed stream: expected an error event, got {events[-1]}")
+    if history_texts(service) != before:
+        failures.append("failed stream: the previous exchange was removed from the history")
+
+    # The client disconnects mid-stream: the half-finished turn is dropped
+    stream = service.stream_chat_message(USER_ID, "And 2x - 4 = 10?", PROFILE)
+    next(stream)
+    stream.close()
+    if history_texts(service) != before:
+        failures.append("abandoned stream: the history does not match the one before the turn")
+
+    # A completed stream is kept
+    list(service.stream_chat_message(USER_ID, "And 2x - 4 = 10?", PROFILE))
+    if len(history_texts(service)) != len(before) + 2:
+        failures.append("completed stream: the exchange was not added to the history")
+
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    print(f"{len(failures)} chat rewind checks failed.")
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,259 @@
+# backend/bench/fake_gemini.py
+#
+# Offline stand-in for google.generativeai.GenerativeModel, used by the load benchmark
+# (and by `python -m bench.offline_server` for working without an API key).
+# Responses are canned per prompt type, latencies are drawn from a log-normal
+# distribution, and a configurable share of calls fail or return malformed JSON.
+
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+FAKE_QUESTION = {
+    "passage": None,
+    "question_text": "If 3x + 5 = 20, what is the value of x?",
+    "options": ["A) 3", "B) 5", "C) 15", "D) 25"],
+    "correct_answer_info": {
+        "answer": "B) 5",
+        "explanation": "Subtract 5 from both sides to get 3x = 15, then divide by 3."
+    }
+}
+
+FAKE_EVALUATION = {
+    "feedback_summary": "Good attempt.",
+    "personal_feedback": "You set the problem up correctly.",
+    "explanation_comparison": "Your steps match the standard solution.",
+    "common_misconceptions": "Forgetting to apply an operation to both sides.",
+    "correct_explanation_reiteration": ["Step 1: Isolate the variable term.", "Step 2: Divide by the coefficient."],
+    "next_steps_suggestion": ["Practice 5 more linear equations."],
+    "visual_aid_suggestion": "A balance scale diagram.",
+    "topic_sub_skills_evaluated": ["algebra: linear equations"],
+    "misconceptions_identified": []
+}
+
+FAKE_STUDY_PLAN = {
+    "summary": "Focus on algebra this week while keeping reading skills fresh.",
+    "recommended_topics": [
+        {"topic_name": "Algebra: Linear Equations", "reason": "Recent mistakes.", "suggested_resource_types": ["diagrams"], "target_difficulty": "medium"}
+    ],
+    "practice_strategies": ["Dedicate 30 minutes daily to algebra problems."],
+    "study_tips": ["Review every mistake."],
+    "motivational_message": "Every step you take is progress."
+}
+
+FAKE_ASSESSMENT = {"Algebra": "intermediate", "Reading Comprehension": "beginner"}
+
+FAKE_IMAGE_ANSWER = {
+    "ai_answer": "The correct answer is B",
+    "ai_solution": ["Step 1: Read the graph.", "Step 2: Compare the slopes."],
+    "ai_confidence": "High"
+}
+
+FAKE_ESSAY_FEEDBACK = {
+    "overall_score": "4/6",
+    "strengths": ["Clear thesis statement."],
+    "areas_for_improvement": ["Develop the analysis in paragraph 2."],
+    "detailed_feedback": [{"category": "Analysis", "score": "4/6", "comment": "On the right track."}],
+    "general_comments": "A solid attempt."
+}
+
+FAKE_CHAT_REPLY = (
+    "Great question! Let's break it down step by step. What do you think the first "
+    "operation should be to isolate the variable?"
+)
+
+_SINGLE_CALL_COUNT_PATTERN = re.compile(r"Grade each of the following (\d+) student answers")
+
+
+def _fenced(payload):
+    return "```json\n" + json.dumps(payload, indent=2) + "\n```"
+
+
+def canned_response_text(prompt_text):
+    """Picks a canned response for a prompt by recognizing the GeminiService prompt that produced it."""
+    if "Summarize this SAT tutoring conversation" in prompt_text:
+        return "The student is practicing linear equations and understands isolating the variable."
+    single_call = _SINGLE_CALL_COUNT_PATTERN.search(prompt_text)
+    if single_call:
+        return _fenced([
+            dict(FAKE_EVALUATION, index=index, is_correct=random.random() < 0.7)
+            for index in range(int(single_call.group(1)))
+        ])
+    if "Analyze the student's answer" in prompt_text:
+        return _fenced(dict(FAKE_EVALUATION, is_correct=random.random() < 0.7))
+    if "SAT Essay Grader" in prompt_text:
+        return _fenced(FAKE_ESSAY_FEEDBACK)
+    if "study plan" in prompt_text:
+        return _fenced(FAKE_STUDY_PLAN)
+    if "assess a student's current knowledge" in prompt_text:
+        return _fenced(FAKE_ASSESSMENT)
+    if "Analyze the provided image" in prompt_text:
+        return _fenced(FAKE_IMAGE_ANSWER)
+    if "question based on the following context" in prompt_text:
+        return _fenced(FAKE_QUESTION)
+    if "Generate a" in prompt_text and "question" in prompt_text:
+        return _fenced(FAKE_QUESTION)
+    if "lexicographer" in prompt_text:
+        return "The joy of the unexpected holiday was ephemeral, lasting only a day."
+    return FAKE_CHAT_REPLY
+
+
+class FakeConfig:
+    """Latency and failure settings shared by every fake model."""
+
+    def __init__(self, latency_median_seconds=0.8, latency_sigma=0.5, failure_rate=0.0, malformed_rate=0.0, stream_chunks=8, seed=None):
+        self.latency_median_seconds = latency_median_seconds
+        self.latency_sigma = latency_sigma
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.stream_chunks = stream_chunks
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self):
+        with self._lock:
+            return self.latency_median_seconds * math.exp(self._random.gauss(0, self.latency_sigma))
+
+    def roll(self, rate):
+        with self._lock:
+            return self._random.random() < rate
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    """Mimics GenerateContentResponse: .text, .usage_metadata and iteration over stream chunks."""
+
+    def __init__(self, text, prompt_tokens, chunk_delay_seconds=0.0, chunk_count=1):
+        self.text = text
+        self.usage_metadata = _UsageMetadata(prompt_tokens, len(text) // 4)
+        self._chunk_delay_seconds = chunk_delay_seconds
+        self._chunk_count = max(1, chunk_count)
+
+    def __iter__(self):
+        size = math.ceil(len(self.text) / self._chunk_count) or 1
+        for start in range(0, len(self.text), size):
+            time.sleep(self._chunk_delay_seconds)
+            yield FakeResponse(self.text[start:start + size], 0)
+
+
+def _contents_text(contents):
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        return " ".join(_contents_text(part) for part in contents.get("parts", []))
+    if isinstance(contents, (list, tuple)):
+        return " ".join(_contents_text(item) for item in contents)
+    parts = getattr(contents, "parts", None)
+    if parts is not None:
+        return " ".join(part.text for part in parts)
+    return getattr(contents, "text", "") or ""
+
+
+class FakeGenerativeModel:
+    config = FakeConfig()
+
+    def __init__(self, model_name="fake-model", system_instruction=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def _respond(self, contents, generation_config=None):
+        prompt_text = _contents_text(contents)
+        if self.config.roll(self.config.failure_rate):
+            raise google_exceptions.ServiceUnavailable("Injected failure from the fake Gemini model.")
+        text = canned_response_text(prompt_text)
+        if (generation_config or {}).get("response_mime_type") == "application/json" and text.startswith("```json"):
+            # JSON mode returns bare JSON, without a Markdown fence
+            text = text[len("```json"):-len("```")].strip()
+        if self.config.roll(self.config.malformed_rate):
+            text = text[: len(text) // 2]
+        return FakeResponse(text, (len(prompt_text) + len(self.system_instruction or "")) // 4)
+
+    def generate_content(self, contents, stream=False, generation_config=None, **kwargs):
+        latency = self.config.sample_latency()
+        if stream:
+            # Time to the first chunk is ~30% of the latency; the rest is spread over chunks
+            time.sleep(latency * 0.3)
+            response = self._respond(contents, generation_config)
+            response._chunk_count = self.config.stream_chunks
+            response._chunk_delay_seconds = latency * 0.7 / self.config.stream_chunks
+            return response
+        time.sleep(latency)
+        return self._respond(contents, generation_config)
+
+    async def generate_content_async(self, contents, generation_config=None, **kwargs):
+        await asyncio.sleep(self.config.sample_latency())
+        return self._respond(contents, generation_config)
+
+    def start_chat(self, history=None):
+        return FakeChatSession(self, history or [])
+
+
+class FakeChatSession:
+    """
+    Mimics ChatSession, keeping history as genai.protos.Content like the real one. As in the
+    real session, a successful exchange is held in _last_sent/_last_received until the
+    history is next read, and rewind() pops the last two history entries when there is none.
+    """
+
+    def __init__(self, model, history):
+        self.model = model
+        self.history = history
+
+    @property
+    def history(self):
+        if self._last_received is not None:
+            self._history += [self._last_sent, self._last_received]
+            self._last_sent = self._last_received = None
+        return self._history
+
+    @history.setter
+    def history(self, history):
+        self._history = [
+            content if isinstance(content, genai.protos.Content) else genai.protos.Content(content)
+            for content in history
+        ]
+        self._last_sent = self._last_received = None
+
+    def _record(self, message, response):
+        self._last_sent = genai.protos.Content(role="user", parts=[genai.protos.Part(text=message)])
+        self._last_received = genai.protos.Content(role="model", parts=[genai.protos.Part(text=response.text)])
+
+    def send_message(self, message, stream=False, **kwargs):
+        response = self.model.generate_content(self.history + [message], stream=stream)
+        self._record(message, response)
+        return response
+
+    async def send_message_async(self, message, **kwargs):
+        response = await self.model.generate_content_async(self.history + [message])
+        self._record(message, response)
+        return response
+
+    def rewind(self):
+        if self._last_received is None:
+            return self._history.pop(-2), self._history.pop()
+        result = self._last_sent, self._last_received
+        self._last_sent = self._last_received = None
+        return result
+
+
+def install(config=None):
+    """
+    Replaces genai.GenerativeModel with FakeGenerativeModel. Must run before app.py is
+    imported, since GeminiService creates its models at construction time.
+    """
+    if config is not None:
+        FakeGenerativeModel.config = config
+    genai.GenerativeModel = FakeGenerativeModel
+    return FakeGenerativeModel.config
@@ -0,0 +1,235 @@
+# backend/bench/load_test.py
+#
+# End-to-end load benchmark that drives the real Flask routes against the offline fake
+# Gemini model, so it needs no API key or network. Run from the backend directory:
+#
+#   python -m bench.load_test --concurrency 16 --requests 200
+#   python -m bench.load_test --scenarios chat,essay --latency-median 1.5 --failure-rate 0.05
+#
+# Each scenario is run on its own and reported as requests/s plus p50/p95/p99 latency.
+# The app runs against a throwaway SQLite database and cache files in a temp directory.
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_gemini import FakeConfig, install  # noqa: E402
+
+SCENARIOS = ("question", "evaluate", "mock_section", "chat", "chat_stream", "essay")
+
+SAMPLE_ESSAY = (
+    "Technology has changed how students learn. Online resources make information easy to find, "
+    "but they also make it easy to be distracted. In this essay I argue that schools should teach "
+    "students how to manage their attention, because knowing where to find facts matters less than "
+    "knowing how to think about them."
+)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class ScenarioRunner:
+    """Holds per-worker state (users, chat sessions) and performs one request of a scenario."""
+
+    def __init__(self, flask_app, mock_test_id):
+        self.flask_app = flask_app
+        self.mock_test_id = mock_test_id
+        self._local = threading.local()
+        self._counter = 0
+        self._counter_lock = threading.Lock()
+
+    def _next_number(self):
+        with self._counter_lock:
+            self._counter += 1
+            return self._counter
+
+    def _client(self):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.flask_app.test_client()
+        return self._local.client
+
+    def _create_user(self):
+        response = self._client().post('/user', json={
+            "username": f"bench-user-{os.getpid()}-{self._next_number()}",
+            "learning_goals": ["Improve math score"],
+            "learning_style_preference": "visual",
+            "current_knowledge_level": {"Algebra": "intermediate"},
+        })
+        return response.get_json()["user"]["id"]
+
+    def _worker_user(self):
+        if not hasattr(self._local, "user_id"):
+            self._local.user_id = self._create_user()
+        return self._local.user_id
+
+    def run(self, scenario):
+        """Performs one request of `scenario`; returns (elapsed_seconds, ok). Setup calls are not timed."""
+        client = self._client()
+        number = self._next_number()
+
+        if scenario == "question":
+            started = time.perf_counter()
+            response = client.post('/generate_question', json={"topic": "Algebra", "difficulty": "medium", "user_id": self._worker_user()})
+            return time.perf_counter() - started, response.status_code == 200
+
+        if scenario == "evaluate":
+            # Free-response answers go to Gemini; a unique answer keeps the response cache out of it
+            started = time.perf_counter()
+            response = client.post('/evaluate_answer', json={
+                "question_text": "If 3x + 5 = 20, what is the value of x?",
+                "user_answer": f"x = {number}",
+                "correct_answer_info": {"answer": "5", "explanation": "3x = 15, so x = 5."},
+                "question_type": "free_response",
+                "topic": "Algebra",
+                "user_id": self._worker_user(),
+            })
+            return time.perf_counter() - started, response.status_code == 200
+
+        if scenario == "mock_section":
+            # An attempt per request (one active attempt per user and test is allowed)
+            user_id = self._create_user()
+            attempt = client.post(f'/mock_tests/{self.mock_test_id}/start', json={"user_id": user_id}).get_json()
+            attempt_id = attempt["attempt_id"]
+
+            started = time.perf_counter()
+            section = client.get(f'/mock_tests/attempt/{attempt_id}/section/1')
+            questions = [question for question in section.get_json().get("questions", []) if "error" not in question]
+            answers = [
+                {
+                    "temp_id": question.get("temp_id"),
+                    "question_text": question["question_text"],
+                    "user_answer": (question.get("options") or ["A"])[0],
+                    "correct_answer_info": question["correct_answer_info"],
+                    "options": question.get("options"),
+                }
+                for question in questions
+            ]
+            ok = section.status_code == 200 and bool(answers)
+            if ok:
+                submitted = client.post(f'/mock_tests/attempt/{attempt_id}/section/1/submit', json={"user_id": user_id, "answers": answers})
+                ok = submitted.status_code == 200
+            return time.perf_counter() - started, ok
+
+        if scenario in ("chat", "chat_stream"):
+            user_id = self._worker_user()
+            if not getattr(self._local, "chat_started", False):
+                client.post('/chat/start', json={"user_id": user_id})
+                self._local.chat_started = True
+
+            started = time.perf_counter()
+            if scenario == "chat":
+                response = client.post('/chat/send_message', json={"user_id": user_id, "message": f"How do I solve equation {number}?"})
+                ok = response.status_code == 200
+            else:
+                response = client.post('/chat/send_message_stream', json={"user_id": user_id, "message": f"How do I solve equation {number}?"})
+                body = response.get_data(as_text=True)  # Consumes the whole event stream
+                ok = response.status_code == 200 and "event: done" in body
+            return time.perf_counter() - started, ok
+
+        if scenario == "essay":
+            started = time.perf_counter()
+            response = client.post(f'/user/{self._worker_user()}/essays/submit', json={
+                "essay_text": f"{SAMPLE_ESSAY} (draft {number})",
+                "essay_title": "Technology and Learning",
+            })
+            return time.perf_counter() - started, response.status_code == 201
+
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def run_scenario(runner, scenario, total_requests, concurrency):
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for elapsed, ok in executor.map(lambda _: runner.run(scenario), range(total_requests)):
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+    wall_time = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "requests": total_requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "wall_time_seconds": round(wall_time, 3),
+        "requests_per_second": round(total_requests / wall_time, 2) if wall_time else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load benchmark for the SAT Gemini agent backend.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario")
+    parser.add_argument("--latency-median", type=float, default=0.8, help="Median fake Gemini latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal spread of the fake latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of fake Gemini calls that raise")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of fake Gemini responses with truncated JSON")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--with-question-pool", action="store_true", help="Run the background question pool refill")
+    parser.add_argument("--json", dest="json_output", help="Also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    # Everything the app writes goes to a temp directory, set up before app.py is imported
+    work_dir = tempfile.mkdtemp(prefix="sat-bench-")
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+    os.environ["GEMINI_RESPONSE_CACHE_PATH"] = os.path.join(work_dir, "response_cache.db")
+    os.environ["CHAT_SESSION_DB_PATH"] = os.path.join(work_dir, "chat_sessions.db")
+    os.environ["QUESTION_POOL_ENABLED"] = "true" if args.with_question_pool else "false"
+
+    install(FakeConfig(
+        latency_median_seconds=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        failure_rate=args.failure_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    ))
+    import app as backend  # noqa: E402
+    backend.start_question_pool_worker()
+
+    with backend.app.app_context():
+        mock_test_id = backend.MockTest.query.first().id
+    runner = ScenarioRunner(backend.app, mock_test_id)
+
+    print(f"Work directory: {work_dir}")
+    print(f"Fake Gemini latency median {args.latency_median}s (sigma {args.latency_sigma}), failure rate {args.failure_rate}, malformed rate {args.malformed_rate}")
+    print(f"{'scenario':<14}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+
+    results = []
+    for scenario in scenarios:
+        result = run_scenario(runner, scenario, args.requests, args.concurrency)
+        results.append(result)
+        print(f"{scenario:<14}{result['requests']:>9}{result['errors']:>8}{result['requests_per_second']:>9}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}")
+
+    if args.json_output:
+        with open(args.json_output, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
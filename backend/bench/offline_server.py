@@ -0,0 +1,34 @@
+# backend/bench/offline_server.py
+#
+# Serves the app against the offline fake Gemini model, for working on the frontend or
+# trying the routes without an API key or network. Uses the normal database and caches.
+# Run from the backend directory:
+#
+#   python -m bench.offline_server [--port 5000]
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_gemini import FakeConfig, install  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Flask app against the offline fake Gemini model.")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--latency-median", type=float, default=0.8, help="Median fake model latency in seconds.")
+    args = parser.parse_args()
+
+    # The fake has to replace genai.GenerativeModel before app.py creates its services
+    os.environ.setdefault("GOOGLE_API_KEY", "offline")
+    install(FakeConfig(latency_median_seconds=args.latency_median))
+    import app as backend  # noqa: E402
+
+    backend.start_question_pool_worker()
+    backend.app.run(port=args.port)
+
+
+if __name__ == '__main__':
+    main()
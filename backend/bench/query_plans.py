@@ -0,0 +1,159 @@
+# backend/bench/query_plans.py
+#
+# Checks that the per-user queries behind the hot routes are served by indexes. Each query
+# is run through SQLite's EXPLAIN QUERY PLAN against a database created from models.py
+# (including create_missing_indexes), seeded with a few hundred users' worth of rows and
+# ANALYZEd so the planner weighs the indexes against real table sizes. A query fails if
+# its plan scans a whole table or does not use the index listed for it.
+# Run from the backend directory; exits non-zero if any query fails:
+#
+#   python -m bench.query_plans
+
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from models import (  # noqa: E402
+    db, create_missing_indexes, User, QuestionAttempt, UserTopicDailyStats, MockTest, MockTestSection,
+    UserMockTestAttempt, UserWordProgress, UserEssaySubmission, Word, PooledQuestion, UserPooledQuestion
+)
+
+USER_ID = 1
+USERS = 200
+TOPICS = ("Algebra", "Geometry", "Reading Comprehension", "Grammar", "Data Analysis", "Vocabulary")
+DIFFICULTIES = ("easy", "medium", "hard")
+QUESTION_TYPES = ("multiple_choice", "reading_comprehension")
+
+
+def seed():
+    """Inserts enough rows per table that a full scan costs the planner more than an index lookup."""
+    start = datetime(2024, 1, 1)
+    words = 500
+    pooled = [
+        {"topic": topic, "difficulty": difficulty, "question_type": question_type, "question_json": "{}", "times_served": index % 4}
+        for topic in TOPICS for difficulty in DIFFICULTIES for question_type in QUESTION_TYPES for index in range(20)
+    ]
+    tables = [
+        (User, [{"id": user_id, "username": f"student{user_id}"} for user_id in range(1, USERS + 1)]),
+        (Word, [{"id": word_id, "term": f"word{word_id}", "definition": "A word."} for word_id in range(1, words + 1)]),
+        (MockTest, [{"id": test_id, "title": f"Mock test {test_id}", "total_duration_minutes": 180} for test_id in range(1, 11)]),
+        (MockTestSection, [
+            {"mock_test_id": test_id, "title": f"Section {order}", "order": order, "duration_minutes": 45, "question_generation_config": "{}"}
+            for test_id in range(1, 11) for order in range(1, 5)
+        ]),
+        (QuestionAttempt, [
+            {"user_id": user_id, "timestamp": start + timedelta(hours=index), "topic": TOPICS[index % len(TOPICS)], "is_image_question": False}
+            for user_id in range(1, USERS + 1) for index in range(50)
+        ]),
+        (UserTopicDailyStats, [
+            {"user_id": user_id, "topic": topic, "day": date(2024, 1, 1) + timedelta(days=day), "total_count": 2, "graded_count": 2, "correct_count": 1}
+            for user_id in range(1, USERS + 1) for topic in TOPICS for day in range(5)
+        ]),
+        (UserMockTestAttempt, [
+            {"user_id": user_id, "mock_test_id": index + 1, "start_time": start + timedelta(days=index), "status": "completed" if index < 5 else "started"}
+            for user_id in range(1, USERS + 1) for index in range(6)
+        ]),
+        (UserWordProgress, [
+            {"user_id": user_id, "word_id": word_id, "status": ("new", "learning", "mastered", "needs_review")[word_id % 4]}
+            for user_id in range(1, USERS + 1) for word_id in range(1, 41)
+        ]),
+        (UserEssaySubmission, [
+            {"user_id": user_id, "essay_text": "An essay.", "submission_date": start + timedelta(days=index)}
+            for user_id in range(1, USERS + 1) for index in range(5)
+        ]),
+        (PooledQuestion, pooled),
+        (UserPooledQuestion, [
+            {"user_id": user_id, "pooled_question_id": (user_id * 7 + index) % len(pooled) + 1}
+            for user_id in range(1, USERS + 1) for index in range(3)
+        ]),
+    ]
+    for model, rows in tables:
+        db.session.execute(model.__table__.insert(), rows)
+    db.session.commit()
+    db.session.connection().exec_driver_sql("ANALYZE")
+
+
+def hot_queries():
+    """
+    (route, index, query) triples mirroring the per-request queries in app.py and services/.
+    `index` is the name (or prefix, for SQLite's automatic unique-constraint indexes) of the
+    index the plan must use.
+    """
+    daily_stats_by_topic = db.session.query(
+        UserTopicDailyStats.topic,
+        db.func.sum(UserTopicDailyStats.graded_count),
+        db.func.sum(UserTopicDailyStats.correct_count)
+    ).filter(UserTopicDailyStats.user_id == USER_ID).group_by(UserTopicDailyStats.topic)
+    already_served = db.session.query(UserPooledQuestion.pooled_question_id).filter_by(user_id=USER_ID)
+
+    return [
+        ("/user (lookup by username)", "sqlite_autoindex_user_", User.query.filter_by(username="student")),
+        ("/get_performance_summary?user_id", "sqlite_autoindex_user_topic_daily_stats_", daily_stats_by_topic),
+        ("/user/<id>/strengths_weaknesses", "sqlite_autoindex_user_topic_daily_stats_", daily_stats_by_topic),
+        ("/user/<id>/performance_trends (topics)", "ix_user_topic_daily_stats_user_day", UserTopicDailyStats.query.filter(
+            UserTopicDailyStats.user_id == USER_ID, UserTopicDailyStats.graded_count > 0
+        ).order_by(UserTopicDailyStats.day.asc())),
+        ("/user/<id>/performance_trends (mock tests)", "ix_user_mock_test_attempt_user_status_start", UserMockTestAttempt.query.filter_by(
+            user_id=USER_ID, status='completed'
+        ).order_by(UserMockTestAttempt.start_time.asc())),
+        ("question history", "ix_question_attempt_user_timestamp", QuestionAttempt.query.filter_by(user_id=USER_ID).order_by(QuestionAttempt.timestamp.asc())),
+        ("/mock_tests/<id>/start (active attempt)", "ix_user_mock_test_attempt_user_test_status", UserMockTestAttempt.query.filter_by(user_id=USER_ID, mock_test_id=1, status='started')),
+        ("/mock_tests/<id>/start (first section)", "ix_mock_test_section_test_order", MockTestSection.query.filter_by(mock_test_id=1, order=1)),
+        ("section submit (next section)", "ix_mock_test_section_test_order", db.session.query(db.func.max(MockTestSection.order)).filter_by(mock_test_id=1)),
+        ("/user/<id>/mock_test_attempts", "ix_user_mock_test_attempt_user_start", UserMockTestAttempt.query.filter_by(user_id=USER_ID).order_by(UserMockTestAttempt.start_time.desc())),
+        ("/user/<id>/word_progress", "sqlite_autoindex_user_word_progress_", UserWordProgress.query.filter_by(user_id=USER_ID, word_id=1)),
+        ("/user/<id>/vocabulary_summary", "ix_user_word_progress_user_status", UserWordProgress.query.filter_by(user_id=USER_ID, status='mastered')),
+        ("/user/<id>/progress_for_words", "sqlite_autoindex_user_word_progress_", UserWordProgress.query.filter(
+            UserWordProgress.user_id == USER_ID, UserWordProgress.word_id.in_([1, 2, 3])
+        )),
+        ("/words/add_to_list (term lookup)", "sqlite_autoindex_word_", Word.query.filter_by(term="ephemeral")),
+        ("/user/<id>/essays", "ix_user_essay_submission_user_date", UserEssaySubmission.query.filter_by(user_id=USER_ID).order_by(UserEssaySubmission.submission_date.desc())),
+        ("/user/<id>/essays/<id>", "INTEGER PRIMARY KEY", UserEssaySubmission.query.filter_by(id=1, user_id=USER_ID)),
+        ("question pool take", "ix_pooled_question_bucket", PooledQuestion.query.filter_by(
+            topic="Algebra", difficulty="medium", question_type="multiple_choice"
+        ).filter(~PooledQuestion.id.in_(already_served)).order_by(
+            PooledQuestion.times_served.asc(), PooledQuestion.id.asc()
+        ).limit(5)),
+    ]
+
+
+def query_plan(query):
+    """Returns the EXPLAIN QUERY PLAN lines of `query`."""
+    compiled = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    return [row[-1] for row in db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()]
+
+
+def plan_problems(plan, index):
+    """Returns what is wrong with `plan`: full table scans, and `index` not being used."""
+    # A plan line "SCAN <table>" without "USING ... INDEX" reads every row of the table
+    problems = [line for line in plan if line.startswith("SCAN") and "INDEX" not in line]
+    if not any(f"USING {index}" in line or f"INDEX {index}" in line for line in plan):
+        problems.append(f"{index} not used: {'; '.join(plan)}")
+    return problems
+
+
+def main():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    failures = 0
+    with app.app_context():
+        db.create_all()
+        create_missing_indexes()
+        seed()
+        for route, index, query in hot_queries():
+            problems = plan_problems(query_plan(query), index)
+            print(f"{'FAIL' if problems else 'ok':<6}{route}" + (f"  ({'; '.join(problems)})" if problems else ""))
+            failures += bool(problems)
+
+    print(f"{failures} queries with full table scans or without their index.")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
@@ -1,10 +1,49 @@
 # backend/models.py
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
 import json
 
 db = SQLAlchemy()
 
+
+class JSONText(TypeDecorator):
+    """
+    A JSON document kept as a JSON string on the Python side, like the plain Text columns it
+    replaces. PostgreSQL stores it as native JSONB; other databases keep it as TEXT.
+    Dicts and lists are accepted too and stored as their JSON. On PostgreSQL, a value that
+    is not valid JSON (e.g. an empty string in a legacy row) is stored as a JSON string
+    and read back unchanged, so such columns must not hold bare JSON string documents.
+    """
+    impl = db.Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(JSONB(none_as_null=True))
+        return dialect.type_descriptor(db.Text())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            return value if dialect.name == 'postgresql' else json.dumps(value)
+        if dialect.name != 'postgresql':
+            return value
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name != 'postgresql':
+            return value
+        # JSON strings are the non-JSON text stored above
+        return value if isinstance(value, str) else json.dumps(value)
+
+
 # NEW MODEL: User
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -13,10 +52,10 @@ class User(db.Model):
     attempts = db.relationship('QuestionAttempt', backref='user', lazy=True)
 
     # NEW FIELDS FOR USER PROFILE
-    learning_goals = db.Column(db.Text, nullable=True) # Stores JSON string, e.g., '["master Python data analysis", "achieve SAT math score 700"]'
+    learning_goals = db.Column(JSONText, nullable=True) # Stores JSON string, e.g., '["master Python data analysis", "achieve SAT math score 700"]'
     learning_style_preference = db.Column(db.String(50), nullable=True) # E.g., "visual", "auditory", "kinesthetic", "reading/writing"
-    current_knowledge_level = db.Column(db.Text, nullable=True) # Stores JSON string, e.g., '{"math": "intermediate", "reading": "beginner"}'
-    preferences = db.Column(db.Text, nullable=True) # Stores JSON string, e.g., '{"explanation_detail": "high", "exercise_type": "interactive"}'
+    current_knowledge_level = db.Column(JSONText, nullable=True) # Stores JSON string, e.g., '{"math": "intermediate", "reading": "beginner"}'
+    preferences = db.Column(JSONText, nullable=True) # Stores JSON string, e.g., '{"explanation_detail": "high", "exercise_type": "interactive"}'
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -55,6 +94,11 @@ class QuestionAttempt(db.Model):
     ai_generated_solution = db.Column(db.Text, nullable=True)
     ai_generated_answer = db.Column(db.String(255), nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_question_attempt_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_question_attempt_user_topic', 'user_id', 'topic'),
+    )
+
     def __repr__(self):
         return f'<QuestionAttempt {self.id} - {"Image" if self.is_image_question else self.topic}>'
 
@@ -82,6 +126,89 @@ class QuestionAttempt(db.Model):
         return data
 
 
+class UserTopicDailyStats(db.Model):
+    # Rollup of a user's graded text-question attempts per topic and day, so dashboards
+    # don't rescan QuestionAttempt. Kept current by add_attempt_to_daily_stats().
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    topic = db.Column(db.String(100), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    total_count = db.Column(db.Integer, default=0, nullable=False) # All attempts
+    graded_count = db.Column(db.Integer, default=0, nullable=False) # Attempts with is_correct set
+    correct_count = db.Column(db.Integer, default=0, nullable=False)
+    time_taken_seconds_sum = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'topic', 'day', name='_user_topic_day_uc'),
+        db.Index('ix_user_topic_daily_stats_user_day', 'user_id', 'day'),
+    )
+
+
+def _daily_stats_increments(attempt):
+    return {
+        'total_count': 1,
+        'graded_count': 1 if attempt.is_correct is not None else 0,
+        'correct_count': 1 if attempt.is_correct else 0,
+        'time_taken_seconds_sum': attempt.time_taken_seconds or 0,
+    }
+
+def add_attempt_to_daily_stats(attempt):
+    """
+    Adds a new QuestionAttempt to its UserTopicDailyStats row within the caller's transaction,
+    so the rollup is committed together with the attempt. Image questions have no topic and
+    are not rolled up.
+    """
+    if attempt.is_image_question or not attempt.topic or attempt.user_id is None:
+        return
+    key = {'user_id': attempt.user_id, 'topic': attempt.topic, 'day': (attempt.timestamp or datetime.utcnow()).date()}
+    increments = _daily_stats_increments(attempt)
+    update_values = {getattr(UserTopicDailyStats, name): getattr(UserTopicDailyStats, name) + value for name, value in increments.items()}
+
+    if UserTopicDailyStats.query.filter_by(**key).update(update_values, synchronize_session=False):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(UserTopicDailyStats(**key, **increments))
+    except IntegrityError:
+        # Another request created the row first
+        UserTopicDailyStats.query.filter_by(**key).update(update_values, synchronize_session=False)
+
+def _rolled_up_attempt_filters():
+    """Conditions selecting the QuestionAttempt rows that count toward UserTopicDailyStats."""
+    return (
+        QuestionAttempt.is_image_question.is_(False),
+        QuestionAttempt.topic.isnot(None),
+        QuestionAttempt.user_id.isnot(None)
+    )
+
+def user_topic_daily_stats_missing():
+    """True if UserTopicDailyStats is empty although some attempts would be rolled up into it."""
+    if UserTopicDailyStats.query.first() is not None:
+        return False
+    return db.session.query(QuestionAttempt.id).filter(*_rolled_up_attempt_filters()).first() is not None
+
+def rebuild_user_topic_daily_stats():
+    """Recomputes the whole UserTopicDailyStats table from QuestionAttempt. Returns the number of rows."""
+    day = db.func.date(QuestionAttempt.timestamp)
+    rollup = db.select(
+        QuestionAttempt.user_id,
+        QuestionAttempt.topic,
+        day,
+        db.func.count(QuestionAttempt.id),
+        db.func.count(QuestionAttempt.is_correct),
+        db.func.sum(db.case((QuestionAttempt.is_correct.is_(True), 1), else_=0)),
+        db.func.coalesce(db.func.sum(QuestionAttempt.time_taken_seconds), 0)
+    ).where(*_rolled_up_attempt_filters()).group_by(QuestionAttempt.user_id, QuestionAttempt.topic, day)
+
+    UserTopicDailyStats.query.delete()
+    db.session.execute(db.insert(UserTopicDailyStats).from_select(
+        ['user_id', 'topic', 'day', 'total_count', 'graded_count', 'correct_count', 'time_taken_seconds_sum'],
+        rollup
+    ))
+    db.session.commit()
+    return UserTopicDailyStats.query.count()
+
+
 # New Models for Mock Tests
 class MockTest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -106,7 +233,9 @@ class MockTestSection(db.Model):
     order = db.Column(db.Integer, nullable=False) # To define the sequence of sections
     duration_minutes = db.Column(db.Integer, nullable=False)
     # Stores JSON string, e.g., {"topic": "algebra", "difficulty": "medium", "count": 5, "type": "multiple_choice"}
-    question_generation_config = db.Column(db.Text, nullable=False)
+    question_generation_config = db.Column(JSONText, nullable=False)
+
+    __table_args__ = (db.Index('ix_mock_test_section_test_order', 'mock_test_id', 'order'),)
 
     def to_dict(self):
         return {
@@ -126,7 +255,7 @@ class UserMockTestAttempt(db.Model):
     end_time = db.Column(db.DateTime, nullable=True)
     status = db.Column(db.String(50), default='started', nullable=False) # E.g., 'started', 'in-progress', 'completed'
     # Stores JSON string, e.g., {"section_1_score": 80, "section_2_score": 75}
-    score_details = db.Column(db.Text, nullable=True)
+    score_details = db.Column(JSONText, nullable=True)
     # Relationship to actual questions attempted, if needed for detailed review
     # question_attempts = db.relationship('MockTestQuestionAttempt', backref='user_mock_test_attempt', lazy=True)
 
@@ -135,6 +264,12 @@ class UserMockTestAttempt(db.Model):
     user = db.relationship('User', backref='mock_test_attempts')
     mock_test = db.relationship('MockTest', backref='user_attempts')
 
+    __table_args__ = (
+        db.Index('ix_user_mock_test_attempt_user_test_status', 'user_id', 'mock_test_id', 'status'), # Active attempt lookup
+        db.Index('ix_user_mock_test_attempt_user_status_start', 'user_id', 'status', 'start_time'), # Completed attempts, oldest first
+        db.Index('ix_user_mock_test_attempt_user_start', 'user_id', 'start_time'), # Attempt history, newest first
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -200,7 +335,10 @@ class UserWordProgress(db.Model):
     incorrect_count = db.Column(db.Integer, default=0)
 
     # Unique constraint for user_id and word_id
-    __table_args__ = (db.UniqueConstraint('user_id', 'word_id', name='_user_word_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'word_id', name='_user_word_uc'),
+        db.Index('ix_user_word_progress_user_status', 'user_id', 'status'),
+    )
 
     # Relationships
     user = db.relationship('User', backref=db.backref('word_progress_items', lazy='dynamic'))
@@ -247,10 +385,12 @@ class UserEssaySubmission(db.Model):
     essay_text = db.Column(db.Text, nullable=False)
     submission_date = db.Column(db.DateTime, default=datetime.utcnow)
 
-    feedback_json = db.Column(db.Text, nullable=True) # Stores the detailed JSON feedback from Gemini
+    feedback_json = db.Column(JSONText, nullable=True) # Stores the detailed JSON feedback from Gemini
     score_summary = db.Column(db.String(250), nullable=True) # E.g., "Overall: 4/6, Strengths: Clarity"
 
     user = db.relationship('User', backref=db.backref('essay_submissions', lazy='dynamic'))
+
+    __table_args__ = (db.Index('ix_user_essay_submission_user_date', 'user_id', 'submission_date'),)
     # 'topic' backref is defined in EssayTopic model
 
     def to_dict(self, include_full_text=False, include_full_feedback=False):
@@ -267,4 +407,41 @@ class UserEssaySubmission(db.Model):
             data['essay_text'] = self.essay_text
         if include_full_feedback:
             data['feedback_json'] = json.loads(self.feedback_json) if self.feedback_json else None
-        return data
\ No newline at end of file
+        return data
+
+# Models for the pre-generated question pool
+class PooledQuestion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # Bucket key: questions are served for an exact (topic, difficulty, question_type) match
+    topic = db.Column(db.String(100), nullable=False)
+    difficulty = db.Column(db.String(50), nullable=False)
+    question_type = db.Column(db.String(50), nullable=False)
+    question_json = db.Column(JSONText, nullable=False) # Stores the generated question JSON as returned by GeminiService
+    times_served = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.Index('ix_pooled_question_bucket', 'topic', 'difficulty', 'question_type', 'times_served'),)
+
+    def to_question_dict(self):
+        question = json.loads(self.question_json)
+        question['pooled_question_id'] = self.id
+        return question
+
+class UserPooledQuestion(db.Model):
+    # Records which pooled questions a user has already been served, so they never see one twice
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    pooled_question_id = db.Column(db.Integer, db.ForeignKey('pooled_question.id'), nullable=False)
+    served_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'pooled_question_id', name='_user_pooled_question_uc'),)
+
+
+def create_missing_indexes():
+    """
+    Schema migration for indexes: db.create_all() only creates missing tables, so indexes
+    added to models after a table exists are created here. Safe to run on every start.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
@@ -0,0 +1,75 @@
+# backend/services/answer_grading.py
+
+import re
+
+# Matches a leading choice letter such as "B", "b)", "(B)", "B." or "B: text"
+_CHOICE_PATTERN = re.compile(r'^\(?([A-Ea-e])(?:\)|\.|:|\s*$)\s*(.*)$', re.DOTALL)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def _normalize_text(text):
+    """Lower-cases, collapses whitespace and strips trailing punctuation for comparison."""
+    return _WHITESPACE_PATTERN.sub(' ', text).strip().rstrip('.').casefold()
+
+
+def normalize_choice(value, options=None):
+    """
+    Splits a multiple-choice answer into (letter, normalized_text).
+    Either part may be None, e.g. "B" -> ("B", None), "Navigation" -> (None, "navigation").
+    If `options` is given, a bare answer text is mapped back to its option letter.
+    """
+    if value is None:
+        return None, None
+    value = str(value).strip()
+    if not value:
+        return None, None
+
+    match = _CHOICE_PATTERN.match(value)
+    if match:
+        letter = match.group(1).upper()
+        text = _normalize_text(match.group(2)) or None
+        return letter, text
+
+    text = _normalize_text(value)
+    for option in options or []:
+        option_letter, option_text = normalize_choice(option)
+        if option_letter and option_text == text:
+            return option_letter, text
+    return None, text
+
+
+def score_multiple_choice(user_answer, correct_answer, options=None):
+    """
+    Decides whether `user_answer` matches `correct_answer` without calling the model.
+    Returns True/False, or None when the two cannot be compared reliably
+    (e.g. a bare letter against answer text with no options to map between them).
+    """
+    user_letter, user_text = normalize_choice(user_answer, options)
+    correct_letter, correct_text = normalize_choice(correct_answer, options)
+
+    if user_letter and correct_letter:
+        return user_letter == correct_letter
+    if user_text and correct_text:
+        return user_text == correct_text
+    return None
+
+
+def grade_multiple_choice(user_answer, correct_answer_info, options=None):
+    """
+    Builds a feedback object for a multiple-choice answer from the answer key alone.
+    The explanation already stored with the question is reused; the full AI analysis
+    can be requested separately. Returns None if the answer cannot be scored locally.
+    """
+    correct_answer = correct_answer_info.get('answer')
+    is_correct = score_multiple_choice(user_answer, correct_answer, options)
+    if is_correct is None:
+        return None
+
+    explanation = correct_answer_info.get('explanation')
+    return {
+        "is_correct": is_correct,
+        "feedback_summary": "Correct! Great job on this problem." if is_correct else f"Not quite. The correct answer is {correct_answer}.",
+        "correct_explanation_reiteration": [explanation] if explanation else [],
+        "graded_locally": True,
+        "detailed_feedback_available": True
+    }
@@ -0,0 +1,112 @@
+# backend/services/chat_session_store.py
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ChatSessionStore:
+    """
+    Bounded store of live chat sessions, keyed by user id.
+
+    Live sessions are kept in memory in LRU order and evicted when there are more than
+    `max_sessions`, when their estimated size exceeds `max_memory_bytes` in total, or
+    after `idle_ttl_seconds` without use. Each session is written through to SQLite as
+    a JSON-serializable state dict on every put(), so an evicted session (or one from
+    before a restart) is rebuilt on the next get() by the caller's `restore` function.
+    """
+
+    def __init__(self, max_sessions=500, idle_ttl_seconds=3600, max_memory_bytes=64 * 1024 * 1024, sqlite_path=None, persisted_ttl_seconds=30 * 24 * 3600):
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self._sessions = OrderedDict() # Maps user key to (session, size_bytes, last_used)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS chat_sessions (user_key TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)")
+            self._db.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (time.time() - persisted_ttl_seconds,))
+            self._db.commit()
+
+    @staticmethod
+    def _key(user_id):
+        # user ids arrive both as ints and as strings from JSON bodies
+        return str(user_id)
+
+    def get(self, user_id, restore):
+        """
+        Returns the live session for `user_id`, rehydrating it with restore(state) from
+        SQLite if it was evicted. Returns None if the user has no session.
+        """
+        key = self._key(user_id)
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(key)
+            if entry is not None:
+                session, size_bytes, _ = entry
+                self._sessions[key] = (session, size_bytes, now)
+                self._sessions.move_to_end(key)
+                return session
+
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT state FROM chat_sessions WHERE user_key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+        # restore() runs outside the lock; if a concurrent get() or put() stored a live session
+        # for this user meanwhile, that one wins, so every request works on the same session
+        session = restore(json.loads(row[0]))
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None:
+                self._sessions.move_to_end(key)
+                return entry[0]
+            self._remember(key, session, len(row[0]), now)
+        return session
+
+    def put(self, user_id, session, state):
+        """Stores (or refreshes) a live session and persists its serialized `state`."""
+        key = self._key(user_id)
+        serialized = json.dumps(state)
+        now = time.time()
+        with self._lock:
+            self._remember(key, session, len(serialized), now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO chat_sessions (user_key, state, updated_at) VALUES (?, ?, ?)",
+                    (key, serialized, now)
+                )
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {"live_sessions": len(self._sessions), "estimated_memory_bytes": self._memory_bytes}
+
+    def _remember(self, key, session, size_bytes, now):
+        previous = self._sessions.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous[1]
+        self._sessions[key] = (session, size_bytes, now)
+        self._memory_bytes += size_bytes
+
+        # Evict least recently used sessions, but never the one just stored
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self._memory_bytes > self.max_memory_bytes):
+            self._drop_oldest()
+
+    def _evict_idle(self, now):
+        while self._sessions:
+            _, _, last_used = next(iter(self._sessions.values()))
+            if now - last_used <= self.idle_ttl_seconds:
+                break
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        _, (_, size_bytes, _) = self._sessions.popitem(last=False)
+        self._memory_bytes -= size_bytes
@@ -0,0 +1,91 @@
+# backend/services/database.py
+
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _env_int(env, name, default):
+    return int(env.get(name, default))
+
+
+def sqlite_pragmas(env=os.environ):
+    """
+    PRAGMAs applied to every new SQLite connection. WAL lets readers proceed while a write
+    is in progress, and synchronous=NORMAL is safe under WAL (a power loss can drop the last
+    commits but never corrupts the file) while avoiding an fsync per commit.
+    """
+    return {
+        "journal_mode": env.get("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": env.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        # Negative cache_size is in KiB
+        "cache_size": -_env_int(env, "SQLITE_CACHE_SIZE_MB", "64") * 1024,
+        "mmap_size": _env_int(env, "SQLITE_MMAP_SIZE_MB", "256") * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+
+
+def database_uri(env=os.environ, default="sqlite:///site.db"):
+    """
+    The database URI from DATABASE_URL. postgres:// and postgresql:// URLs (as handed out by
+    most hosting providers) are pointed at the psycopg driver from requirements.txt.
+    """
+    uri = env.get("DATABASE_URL") or default
+    for scheme in ("postgres://", "postgresql://"):
+        if uri.startswith(scheme):
+            return "postgresql+psycopg://" + uri[len(scheme):]
+    return uri
+
+
+def _pool_options(env):
+    # Each worker process keeps its own pool, sized for the threads that touch the database
+    return {
+        "pool_size": _env_int(env, "DB_POOL_SIZE", "10"),
+        "max_overflow": _env_int(env, "DB_MAX_OVERFLOW", "10"),
+        "pool_timeout": _env_int(env, "DB_POOL_TIMEOUT_SECONDS", "30"),
+    }
+
+
+def engine_options(database_uri, env=os.environ):
+    """SQLALCHEMY_ENGINE_OPTIONS for `database_uri`, with pool sizes taken from the environment."""
+    url = make_url(database_uri)
+    if url.get_backend_name() != "sqlite":
+        return {
+            **_pool_options(env),
+            # Server connections are dropped by restarts, failovers and idle timeouts; check before use
+            # and replace them before a proxy or the server closes them
+            "pool_pre_ping": True,
+            "pool_recycle": _env_int(env, "DB_POOL_RECYCLE_SECONDS", "1800"),
+        }
+
+    options = {
+        # pysqlite's busy handler: a writer waits this long for the lock instead of failing with "database is locked"
+        "connect_args": {"timeout": _env_int(env, "SQLITE_BUSY_TIMEOUT_MS", "5000") / 1000, "check_same_thread": False},
+    }
+    if url.database and url.database != ":memory:" and not url.database.startswith("file::memory:"):
+        options.update(_pool_options(env))
+    return options
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Runs the PRAGMAs on every connection `engine` opens (no-op for other databases)."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def configure_database(app, db, env=os.environ):
+    """
+    Initializes `db` for the app with the engine options for its database URI, and applies
+    the SQLite PRAGMAs to every connection. Replaces calling db.init_app(app) directly.
+    """
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], env)
+    db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, sqlite_pragmas(env))
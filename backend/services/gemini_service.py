@@ -6,27 +6,287 @@ import base64
 from io import BytesIO
 from PIL import Image
 import pandas as pd
-import re
-
-_CLEAN_JSON_STRING_PATTERN = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\u0080-\u009F]')
-
-def _clean_json_string(s):
-    """Removes invalid control characters and other problematic chars from a string for JSON parsing."""
-    return _CLEAN_JSON_STRING_PATTERN.sub('', s)
+import time
+import asyncio
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from services.answer_grading import grade_multiple_choice
+from services.response_cache import make_cache_key
+from services.chat_session_store import ChatSessionStore
+from services.metrics import MetricsRegistry
+from services.structured_output import parse_structured_output
+from services.resilience import ResilientCaller
+from services.single_flight import SingleFlight
+from services.response_schemas import (
+    SAT_QUESTION_SCHEMA,
+    EVALUATION_SCHEMA,
+    EVALUATION_LIST_SCHEMA,
+    STUDY_PLAN_SCHEMA,
+    KNOWLEDGE_ASSESSMENT_SCHEMA,
+    IMAGE_ANSWER_SCHEMA,
+    ESSAY_FEEDBACK_SCHEMA,
+)
 
 class GeminiService:
-    def __init__(self, api_key, text_model_name='models/gemini-2.5-flash-preview-05-20', vision_model_name='gemini-pro-vision'):
+    # How long (seconds) results of deterministic prompt methods stay cached.
+    # Methods not listed here are never cached unless given a TTL through `cache_ttls`.
+    # That includes question generation, chat and image analysis, and also the personalized
+    # judgements (answer evaluation, essay feedback, study plans), where a cache hit would
+    # pin one sampled verdict for every later identical submission.
+    DEFAULT_CACHE_TTLS = {
+        'generate_example_sentence_for_word': 30 * 24 * 3600,
+        'generate_sat_question_from_context': 24 * 3600,
+        'assess_knowledge': 24 * 3600,
+    }
+
+    # Total time budget (seconds) per method for a Gemini call, including retries and
+    # rate limiter waits. Methods not listed here get default_deadline_seconds.
+    DEFAULT_DEADLINES = {
+        'generate_example_sentence_for_word': 20,
+        'summarize_chat_history': 30,
+        'send_chat_message': 45,
+        'stream_chat_message': 45,
+        'generate_study_plan': 90,
+        'analyze_image_question': 90,
+        'analyze_essay': 120,
+        'evaluate_answers_in_single_call': 120,
+    }
+
+    # Methods that return JSON, with the response_schema Gemini's native JSON mode
+    # (response_mime_type="application/json") must follow for each
+    RESPONSE_SCHEMAS = {
+        'generate_sat_question': SAT_QUESTION_SCHEMA,
+        'generate_sat_question_from_context': SAT_QUESTION_SCHEMA,
+        'evaluate_and_explain': EVALUATION_SCHEMA,
+        'evaluate_answers_in_single_call': EVALUATION_LIST_SCHEMA,
+        'generate_study_plan': STUDY_PLAN_SCHEMA,
+        'assess_knowledge': KNOWLEDGE_ASSESSMENT_SCHEMA,
+        'analyze_image_question': IMAGE_ANSWER_SCHEMA,
+        'analyze_essay': ESSAY_FEEDBACK_SCHEMA,
+    }
+
+    def __init__(self, api_key, text_model_name='models/gemini-2.5-flash-preview-05-20', vision_model_name='gemini-pro-vision', max_concurrent_requests=8, response_cache=None, cache_ttls=None, chat_session_store=None, chat_history_token_budget=4000, chat_history_recent_messages=6, metrics=None, resilience=None, deadlines=None, default_deadline_seconds=60):
         if not api_key:
             raise ValueError("GEMINI_API_KEY is not set.")
         self.text_model_name = text_model_name
         self.vision_model_name = vision_model_name
         self.text_model = genai.GenerativeModel(self.text_model_name)
         self.vision_model = genai.GenerativeModel(self.vision_model_name)
-        # Store active chat sessions. For production, use a persistent store (e.g., Redis, database).
-        self.active_chat_sessions = {} # Maps user_id to Gemini ChatSession objects
+        # Bounded, evictable store of Gemini ChatSession objects keyed by user_id.
+        # Pass a ChatSessionStore with a sqlite_path to keep sessions across evictions and restarts.
+        self.chat_sessions = chat_session_store or ChatSessionStore()
+        # Once a conversation's history is estimated above this many tokens, all but the
+        # last chat_history_recent_messages entries are replaced by a short summary.
+        self.chat_history_token_budget = chat_history_token_budget
+        self.chat_history_recent_messages = chat_history_recent_messages
+        # Latency, token usage and parse failures of every Gemini call, per method
+        self.metrics = metrics or MetricsRegistry()
+        # Retries with backoff, plus the optional rate limiter and circuit breaker, around every Gemini call
+        self.resilience = resilience or ResilientCaller()
+        if self.resilience.on_retry is None:
+            self.resilience.on_retry = self.metrics.record_retry
+        self.deadlines = dict(self.DEFAULT_DEADLINES, **(deadlines or {}))
+        self.default_deadline_seconds = default_deadline_seconds
+        # Shared worker pool for fan-out calls; its size caps how many Gemini requests
+        # this service has in flight at once, across all concurrent HTTP requests.
+        self.max_concurrent_requests = max_concurrent_requests
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_requests, thread_name_prefix="gemini")
+        # Optional ResponseCache; results of the methods in cache_ttls are served from it
+        self.response_cache = response_cache
+        self.cache_ttls = dict(self.DEFAULT_CACHE_TTLS, **(cache_ttls or {}))
+        # Concurrent identical prompts share one in-flight Gemini request
+        self.in_flight = SingleFlight()
+        # Chat history summaries run on their own small pool, so they never take slots
+        # from the fan-out calls above; the async path runs them as event-loop tasks
+        self._compaction_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-compaction")
+        self._background_tasks = set()
+
+    def _json_generation_config(self, method_name):
+        """Native JSON mode settings for `method_name`, or None if it doesn't return JSON."""
+        schema = self.RESPONSE_SCHEMAS.get(method_name)
+        if schema is None:
+            return None
+        generation_config = {"response_mime_type": "application/json"}
+        # Gemini rejects OBJECT schemas without properties; those get JSON mode alone
+        if schema.get("properties") or schema.get("items"):
+            generation_config["response_schema"] = schema
+        return generation_config
+
+    def _cache_key(self, method_name, prompt):
+        return make_cache_key(self.text_model_name, prompt, self._json_generation_config(method_name))
+
+    def _cache_get(self, method_name, prompt):
+        """Returns the cached result of `method_name` for this prompt, or None."""
+        if self.response_cache is None or not self.cache_ttls.get(method_name):
+            return None
+        return self.response_cache.get(self._cache_key(method_name, prompt))
+
+    def _cache_set(self, method_name, prompt, result):
+        """Caches a successful result of `method_name` for this prompt using the method's TTL."""
+        ttl = self.cache_ttls.get(method_name)
+        if self.response_cache is None or not ttl:
+            return
+        self.response_cache.set(self._cache_key(method_name, prompt), result, ttl)
+
+    def _coalesced(self, method_name, prompt, func, variant=0):
+        """
+        Runs func() unless an identical request (same cache key and `variant`) is already
+        in flight, in which case its result is shared. Callers wanting several distinct
+        results for one prompt pass a different variant for each.
+        """
+        return self.in_flight.do((self._cache_key(method_name, prompt), variant), func)
 
+    async def _coalesced_async(self, method_name, prompt, func, variant=0):
+        """Non-blocking variant of _coalesced; `func` returns an awaitable."""
+        return await self.in_flight.do_async((self._cache_key(method_name, prompt), variant), func)
 
-    def generate_sat_question(self, topic, difficulty="medium", question_type="multiple_choice", user_knowledge_level={}):
+    def _deadline(self, method_name):
+        return self.deadlines.get(method_name, self.default_deadline_seconds)
+
+    def _call_upstream(self, method_name, send):
+        """
+        Runs send(timeout) through the resilience layer, recording latency and token usage
+        of every attempt. `send` makes one Gemini request and returns its response.
+        """
+        def attempt(timeout):
+            with self.metrics.track_call(method_name) as call:
+                response = send(timeout)
+                call.record_usage(response)
+            return response
+        return self.resilience.call(method_name, attempt, self._deadline(method_name))
+
+    async def _call_upstream_async(self, method_name, send):
+        """Non-blocking variant of _call_upstream; `send` returns an awaitable."""
+        async def attempt(timeout):
+            with self.metrics.track_call(method_name) as call:
+                response = await send(timeout)
+                call.record_usage(response)
+            return response
+        return await self.resilience.call_async(method_name, attempt, self._deadline(method_name))
+
+    def _generate(self, method_name, contents, model=None, generation_config=None):
+        """Calls generate_content on the text model (or `model`), with retries and per-attempt metrics."""
+        return self._call_upstream(method_name, lambda timeout: (model or self.text_model).generate_content(
+            contents, generation_config=generation_config, request_options={"timeout": timeout}
+        ))
+
+    async def _generate_async(self, method_name, contents, model=None, generation_config=None):
+        """Non-blocking variant of _generate."""
+        return await self._call_upstream_async(method_name, lambda timeout: (model or self.text_model).generate_content_async(
+            contents, generation_config=generation_config, request_options={"timeout": timeout}
+        ))
+
+    @staticmethod
+    def _reask_contents(contents, previous_text, problem):
+        """The original request plus a targeted correction, used for one re-ask after unusable JSON."""
+        correction = f"""
+        Your previous response could not be used: {problem}.
+        Previous response:
+        {previous_text}
+
+        Respond again with only the corrected JSON, in the structure requested above.
+        """
+        if isinstance(contents, list):
+            return contents + [correction]
+        return [contents, correction]
+
+    def _generate_json(self, method_name, contents, model=None, variant=0):
+        """
+        Calls Gemini in native JSON mode with the method's response schema, then parses and
+        validates the response against the same schema. A response that still can't be used
+        triggers one re-ask naming the problem. Text prompts are coalesced with identical
+        in-flight requests.
+        Returns (value, error, raw_text); error is None on success.
+        """
+        if isinstance(contents, str):
+            return self._coalesced(method_name, contents, lambda: self._request_json(method_name, contents, model), variant)
+        return self._request_json(method_name, contents, model)
+
+    def _request_json(self, method_name, contents, model=None):
+        schema = self.RESPONSE_SCHEMAS[method_name]
+        generation_config = self._json_generation_config(method_name)
+        response = self._generate(method_name, contents, model=model, generation_config=generation_config)
+        value, error = parse_structured_output(response.text, schema)
+        if error is None:
+            return value, None, response.text
+
+        self.metrics.record_parse_failure(method_name)
+        self.metrics.record_retry(method_name)
+        print(f"Unusable JSON from Gemini for {method_name} ({error}); asking again.")
+        response = self._generate(method_name, self._reask_contents(contents, response.text, error), model=model, generation_config=generation_config)
+        value, error = parse_structured_output(response.text, schema)
+        if error is not None:
+            self.metrics.record_parse_failure(method_name)
+        return value, error, response.text
+
+    async def _generate_json_async(self, method_name, contents, model=None, variant=0):
+        """Non-blocking variant of _generate_json."""
+        if isinstance(contents, str):
+            return await self._coalesced_async(method_name, contents, lambda: self._request_json_async(method_name, contents, model), variant)
+        return await self._request_json_async(method_name, contents, model)
+
+    async def _request_json_async(self, method_name, contents, model=None):
+        schema = self.RESPONSE_SCHEMAS[method_name]
+        generation_config = self._json_generation_config(method_name)
+        response = await self._generate_async(method_name, contents, model=model, generation_config=generation_config)
+        value, error = parse_structured_output(response.text, schema)
+        if error is None:
+            return value, None, response.text
+
+        self.metrics.record_parse_failure(method_name)
+        self.metrics.record_retry(method_name)
+        print(f"Unusable JSON from Gemini for {method_name} ({error}); asking again.")
+        response = await self._generate_async(method_name, self._reask_contents(contents, response.text, error), model=model, generation_config=generation_config)
+        value, error = parse_structured_output(response.text, schema)
+        if error is not None:
+            self.metrics.record_parse_failure(method_name)
+        return value, error, response.text
+
+    def _map_concurrently(self, func, calls, error_message, timeout=None):
+        """
+        Runs func(**kwargs) for every kwargs dict in `calls` on the shared worker pool.
+        Results are returned in the same order as `calls`; a call that raises or runs for
+        more than `timeout` seconds yields an error object in its slot instead of failing
+        the whole batch. A call's timeout starts when a worker picks it up, so calls queued
+        behind a busy pool are not timed out before they start. Timed-out calls are
+        abandoned, not cancelled: they keep their worker until their own Gemini deadline
+        (see _deadline) ends them.
+        """
+        started_at = {}  # call index -> monotonic time a worker started it
+
+        def run(index, kwargs):
+            started_at[index] = time.monotonic()
+            return func(**kwargs)
+
+        futures = {self._executor.submit(run, index, kwargs): index for index, kwargs in enumerate(calls)}
+        results = [None] * len(calls)
+        pending = set(futures)
+        while pending:
+            wait_seconds = None
+            if timeout is not None:
+                # Wake at the earliest possible expiry; calls not started yet expire no sooner than now + timeout
+                now = time.monotonic()
+                wait_seconds = max(0.0, min(started_at.get(futures[future], now) for future in pending) + timeout - now)
+            done, pending = wait(pending, timeout=wait_seconds)
+
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"Error in concurrent {func.__name__} call: {e}")
+                    results[futures[future]] = {"error": error_message, "details": str(e)}
+
+            if timeout is not None:
+                now = time.monotonic()
+                expired = {future for future in pending if now - started_at.get(futures[future], now) >= timeout}
+                for future in expired:
+                    print(f"Timed out after {timeout}s waiting for concurrent {func.__name__} call.")
+                    results[futures[future]] = {"error": error_message, "details": f"Timed out after {timeout} seconds."}
+                pending -= expired
+        return results
+
+    def _sat_question_prompt(self, topic, difficulty, question_type, user_knowledge_level):
         # Adaptive difficulty logic (Step 6)
         adjusted_difficulty = difficulty
         if user_knowledge_level:
@@ -57,70 +317,50 @@ class GeminiService:
         - If the question_type is 'reading_comprehension', include a 'passage' field with the passage text. If not, set 'passage' to null.
         - Provide 'question_text', an array of 'options' (A, B, C, D as strings), 'correct_answer_info' (an object with 'answer' (the correct option string) and 'explanation' (detailed text)).
         - For math questions, include necessary numbers and context within 'question_text'.
+        """
+        return prompt
 
-        EXAMPLE JSON FORMAT:
-        ```json
-        {{
-            "passage": "---BEGIN PASSAGE---\\nThe phenomenon of bioluminescence, the production of light by living organisms, is widespread in nature, particularly in marine environments. From the twinkling plankton in the ocean's surface to the deep-sea anglerfish with its glowing lure, bioluminescence serves various ecological functions, including attracting prey, defending against predators, and even communicating with conspecifics. While the chemical reactions involved vary among species, they generally involve a light-emitting molecule (luciferin) and an enzyme (luciferase) that catalyzes the reaction, consuming oxygen and ATP to produce light. This cold light, emitting less than 20% heat, is remarkably efficient compared to incandescent bulbs, which lose most energy as heat. The evolutionary pressures that led to such diverse and efficient light-producing mechanisms highlight the adaptive power of natural selection in response to environmental challenges.\\n---END PASSAGE---",
-            "question_text": "Based on the passage, which of the following is NOT a function of bioluminescence mentioned in the text?",
-            "options": [
-                "A) Defense against predators",
-                "B) Navigation in dark environments",
-                "C) Attraction of prey",
-                "D) Communication with other organisms of the same species"
-            ],
-            "correct_answer_info": {{
-                "answer": "B) Navigation in dark environments",
-                "explanation": "The passage explicitly mentions 'attracting prey, defending against predators, and even communicating with conspecifics' as ecological functions. Navigation is not mentioned."
-            }}
-        }}
-        ```
-        Ensure the output is valid JSON, enclosed in triple backticks, and contains ONLY the JSON.
-        """
-        response = self.text_model.generate_content(prompt)
-        text_response = response.text
-        
-        # Extract JSON from triple backticks
-        if text_response.startswith("```json") and text_response.endswith("```"):
-            json_string = text_response[7:-3].strip()
-        else:
-            json_string = text_response.strip()
-
-        # Clean JSON string to remove invalid characters
-        json_string = _clean_json_string(json_string)
-
-        try:
-            return json.loads(json_string)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from Gemini for question generation: {e}")
+    def _sat_question_result(self, question_data, error, text_response):
+        if error is not None:
+            print(f"Error decoding JSON from Gemini for question generation: {error}")
             print(f"Raw Gemini response: {text_response}")
             # Return an error object that the app.py can handle
-            return {"error": "Failed to parse AI question response.", "details": str(e), "raw_response": text_response}
+            return {"error": "Failed to parse AI question response.", "details": error, "raw_response": text_response}
+        return question_data
 
+    def generate_sat_question(self, topic, difficulty="medium", question_type="multiple_choice", user_knowledge_level={}, variant=0):
+        """
+        Concurrent calls with the same arguments and `variant` share one generated question;
+        use different variants to get distinct questions.
+        """
+        prompt = self._sat_question_prompt(topic, difficulty, question_type, user_knowledge_level)
+        return self._sat_question_result(*self._generate_json('generate_sat_question', prompt, variant=variant))
 
-    def evaluate_and_explain(self, question, user_answer, correct_answer_info):
-        EXAMPLE_JSON_OUTPUT = """
-        {
-          "is_correct": true,
-          "feedback_summary": "Correct! Great job on this problem.",
-          "personal_feedback": "You clearly understood the concept.",
-          "explanation_comparison": "Your steps align perfectly with the standard solution.",
-          "common_misconceptions": "Some students might misinterpret the wording.",
-          "correct_explanation_reiteration": [
-            "Step 1: Understand the core concept.",
-            "Step 2: Apply the formula.",
-            "Step 3: Calculate the result."
-          ],
-          "next_steps_suggestion": [
-            "Practice 5 more problems of this type.",
-            "Review related concepts in your textbook."
-          ],
-          "visual_aid_suggestion": "A bar chart showing the distribution of scores across different math topics."
-          "topic_sub_skills_evaluated": ["algebra: linear equations", "problem solving: word problems"],
-          "misconceptions_identified": ["confusing addition with multiplication" (if applicable)]    
-        }
+    async def generate_sat_question_async(self, topic, difficulty="medium", question_type="multiple_choice", user_knowledge_level={}, variant=0):
+        """Non-blocking variant of generate_sat_question for the ASGI server."""
+        prompt = self._sat_question_prompt(topic, difficulty, question_type, user_knowledge_level)
+        return self._sat_question_result(*await self._generate_json_async('generate_sat_question', prompt, variant=variant))
+
+    def generate_sat_questions(self, topic, difficulty="medium", question_type="multiple_choice", count=1, user_knowledge_level={}, variant_namespace=None):
+        """
+        Generates `count` SAT questions concurrently (bounded by max_concurrent_requests).
+        Returns a list in generation order; items that failed contain an "error" key.
+        Each question gets its own variant, so they stay distinct while the i-th question is
+        shared with any identical request for the same topic that is in flight. Callers
+        whose questions must not be shared with other requests (e.g. the question pool)
+        pass their own `variant_namespace`.
         """
+        calls = [
+            {
+                "topic": topic, "difficulty": difficulty, "question_type": question_type, "user_knowledge_level": user_knowledge_level,
+                "variant": index if variant_namespace is None else (variant_namespace, index)
+            }
+            for index in range(count)
+        ]
+        return self._map_concurrently(self.generate_sat_question, calls, "Failed to generate question.")
 
+
+    def _evaluation_prompt(self, question, user_answer, correct_answer_info):
       # Refined prompt for evaluate_and_explain (Step 7)
         prompt = f"""
         You are an expert SAT tutor.
@@ -144,26 +384,133 @@ class GeminiService:
         - Include a `visual_aid_suggestion` (text description) if a visual would help understanding.
         - NEW: Provide `topic_sub_skills_evaluated` as an array of strings (e.g., ["algebra: linear equations", "reading: main idea"]).
         - NEW: Provide `misconceptions_identified` as an array of strings if specific misconceptions are evident from the user's answer. If none, provide an empty array.
+        """
+        return prompt
 
-        EXAMPLE_JSON_OUTPUT:
-        {EXAMPLE_JSON_OUTPUT}
+    def _evaluation_result(self, feedback, error, text_response):
+        if error is not None:
+            print(f"Error decoding JSON from Gemini: {error}")
+            print(f"Raw Gemini response: {text_response}")
+            return {"error": "Failed to parse AI response. Please try again.", "details": error, "raw_response": text_response}
+        return feedback
 
-        Ensure the output is valid JSON, enclosed in triple backticks, and contains only the JSON.
+    def evaluate_and_explain(self, question, user_answer, correct_answer_info):
+        prompt = self._evaluation_prompt(question, user_answer, correct_answer_info)
+        cached = self._cache_get('evaluate_and_explain', prompt)
+        if cached is not None:
+            return cached
+
+        feedback = self._evaluation_result(*self._generate_json('evaluate_and_explain', prompt))
+        if "error" not in feedback:
+            self._cache_set('evaluate_and_explain', prompt, feedback)
+        return feedback
+
+    async def evaluate_and_explain_async(self, question, user_answer, correct_answer_info):
+        """Non-blocking variant of evaluate_and_explain for the ASGI server."""
+        prompt = self._evaluation_prompt(question, user_answer, correct_answer_info)
+        cached = self._cache_get('evaluate_and_explain', prompt)
+        if cached is not None:
+            return cached
+
+        feedback = self._evaluation_result(*await self._generate_json_async('evaluate_and_explain', prompt))
+        if "error" not in feedback:
+            self._cache_set('evaluate_and_explain', prompt, feedback)
+        return feedback
+
+
+    def evaluate_answers(self, submissions, timeout=None, single_call=False):
         """
-        response = self.text_model.generate_content(prompt)
-        text_response = response.text
-        if text_response.startswith("```json") and text_response.endswith("```"):
-            json_string = text_response[7:-3].strip()
-        else:
-            json_string = text_response.strip()
+        Grades a list of answers. Each submission is a dict with `question`, `user_answer`
+        and `correct_answer_info`, plus optional `question_type` and `options`.
+        Returns feedback objects in the same order.
+
+        Multiple-choice answers that can be checked against the answer key are graded
+        locally without a model call. The rest are graded by their own evaluate_and_explain
+        call, run concurrently with a per-item `timeout`. With `single_call=True` they are
+        instead graded in one model call that returns a JSON array; if that response cannot
+        be matched up with the submissions, grading falls back to the concurrent path.
+        """
+        results = [None] * len(submissions)
+        pending_indexes = []
+        for index, submission in enumerate(submissions):
+            if submission.get('question_type') == 'multiple_choice':
+                results[index] = grade_multiple_choice(submission['user_answer'], submission['correct_answer_info'], submission.get('options'))
+            if results[index] is None:
+                pending_indexes.append(index)
+
+        if not pending_indexes:
+            return results
+
+        pending = [
+            {
+                "question": submissions[index]['question'],
+                "user_answer": submissions[index]['user_answer'],
+                "correct_answer_info": submissions[index]['correct_answer_info']
+            }
+            for index in pending_indexes
+        ]
+        feedback_list = self._evaluate_answers_in_single_call(pending) if single_call else None
+        if single_call and feedback_list is None:
+            self.metrics.record_retry('evaluate_answers_in_single_call')
+            print("Single-call grading failed; falling back to per-answer grading.")
+        if feedback_list is None:
+            feedback_list = self._map_concurrently(self.evaluate_and_explain, pending, "Failed to evaluate answer.", timeout=timeout)
+
+        for index, feedback in zip(pending_indexes, feedback_list):
+            results[index] = feedback
+        return results
+
+    def _evaluate_answers_in_single_call(self, submissions):
+        """
+        Grades all submissions with one prompt. Returns a list ordered like `submissions`,
+        or None if the response is not a JSON array covering every answer.
+        """
+        answers_block = "\n\n".join(
+            f"""--- Answer {index} ---
+        SAT Question:
+        {submission['question']}
 
-        try:
-            return json.loads(json_string)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from Gemini: {e}")
-            print(f"Raw Gemini response: {text_response}")
-            return {"error": "Failed to parse AI response. Please try again.", "details": str(e), "raw_response": text_response}
+        Student's Answer: {submission['user_answer']}
+        Correct Answer: {submission['correct_answer_info']['answer']}
+        Detailed Explanation for Correct Answer: {submission['correct_answer_info'].get('explanation', '')}"""
+            for index, submission in enumerate(submissions)
+        )
+
+        prompt = f"""
+        You are an expert SAT tutor.
+        Grade each of the following {len(submissions)} student answers and provide feedback.
+
+        {answers_block}
 
+        **IMPORTANT INSTRUCTIONS FOR JSON OUTPUT:**
+        - The entire response MUST be a single JSON array with exactly one object per answer, in the same order.
+        - Each object must include `index` (the answer number above), `is_correct` (boolean), `feedback_summary` (string),
+          `personal_feedback` (string), `correct_explanation_reiteration` (array of step-by-step strings)
+          and `next_steps_suggestion` (array of strings).
+        """
+        cached = self._cache_get('evaluate_answers_in_single_call', prompt)
+        if cached is not None:
+            return cached
+
+        try:
+            feedback_list, error, _ = self._generate_json('evaluate_answers_in_single_call', prompt)
+        except Exception as e:
+            print(f"Error in single-call answer grading: {e}")
+            return None
+        if error is not None:
+            print(f"Error decoding JSON in single-call answer grading: {error}")
+            return None
+
+        if len(feedback_list) != len(submissions):
+            print(f"Single-call grading returned {len(feedback_list)} items for {len(submissions)} answers.")
+            return None
+
+        feedback_by_index = {feedback.pop('index'): feedback for feedback in feedback_list}
+        if sorted(feedback_by_index) != list(range(len(submissions))):
+            return None
+        ordered_feedback = [feedback_by_index[index] for index in range(len(submissions))]
+        self._cache_set('evaluate_answers_in_single_call', prompt, ordered_feedback)
+        return ordered_feedback
 
     def generate_study_plan(self, user_performance_data, user_profile):
         learning_goals = user_profile.get('learning_goals', [])
@@ -174,37 +521,6 @@ class GeminiService:
         goals_str = json.dumps(learning_goals) if learning_goals else "None specified."
         knowledge_str = json.dumps(knowledge_level, indent=2) if knowledge_level else "Not yet assessed."
         preferences_str = json.dumps(user_preferences) if user_preferences else "None specified."
-        
-        EXAMPLE_STUDY_PLAN_JSON = """
-        {
-          "summary": "Based on your performance and goals, here's a tailored study plan designed to maximize your SAT prep efficiency. You've shown strength in [Strong Area] but need to focus on [Weak Area].",
-          "recommended_topics": [
-            {
-              "topic_name": "Algebra: Linear Equations",
-              "reason": "Consistent 'needs practice' in recent attempts.",
-              "suggested_resource_types": ["interactive exercises", "video tutorial", "diagrams"],
-              "target_difficulty": "medium"
-            },
-            {
-              "topic_name": "Reading: Main Idea Questions",
-              "reason": "Lower accuracy in reading comprehension section, specifically main idea.",
-              "suggested_resource_types": ["practice passages", "text-based explanations", "audio explanation"],
-              "target_difficulty": "hard"
-            }
-          ],
-          "practice_strategies": [
-            "Dedicate 30 minutes daily to problems in your 'needs practice' areas.",
-            "Review solutions for incorrect answers thoroughly, understanding *why* you made a mistake.",
-            "Utilize timed practice tests weekly to build endurance and pacing."
-          ],
-          "study_tips": [
-            "Break down complex topics into smaller, manageable chunks.",
-            "Active recall: test yourself regularly without looking at notes.",
-            "Ensure a consistent study schedule and adequate sleep for optimal performance."
-          ],
-          "motivational_message": "Every step you take is progress. Believe in your ability to master these challenges and achieve your SAT goals!"
-        }
-        """
 
         prompt = f"""
         You are an expert SAT study coach.
@@ -225,80 +541,59 @@ class GeminiService:
         3. Provide specific, actionable recommendations.
         4. Focus on areas marked as 'needs practice' or where accuracy is low.
         5. For `recommended_topics`, each item should be an object with `topic_name`, a concise `reason` (linking to performance or knowledge level), `suggested_resource_types` (an array of strings), and `target_difficulty` ("easy", "medium", "hard").
-
-        Output should be a single JSON object with the following structure.
-
-        EXAMPLE JSON OUTPUT:
-        {EXAMPLE_STUDY_PLAN_JSON}
-
-        Ensure the output is valid JSON, enclosed in triple backticks, and contains only the JSON.
+        6. Open with a `summary` of strengths and focus areas, then give `practice_strategies` and `study_tips` (arrays of strings) and a short `motivational_message`.
         """
-        response = self.text_model.generate_content(prompt)
-        text_response = response.text
-
-        if text_response.startswith("```json") and text_response.endswith("```"):
-            json_string = text_response[7:-3].strip()
-        else:
-            json_string = text_response.strip()
+        cached = self._cache_get('generate_study_plan', prompt)
+        if cached is not None:
+            return cached
 
-        try:
-            return json.loads(json_string)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON for study plan from Gemini: {e}")
+        study_plan, error, text_response = self._generate_json('generate_study_plan', prompt)
+        if error is not None:
+            print(f"Error decoding JSON for study plan from Gemini: {error}")
             print(f"Raw Gemini response for study plan: {text_response}")
-            return {"error": "Failed to parse AI study plan response. Please try again.", "details": str(e), "raw_response": text_response}
+            return {"error": "Failed to parse AI study plan response. Please try again.", "details": error, "raw_response": text_response}
+
+        self._cache_set('generate_study_plan', prompt, study_plan)
+        return study_plan
+
+    def _image_question_contents(self, image_base64_data, user_prompt_text):
+        header, encoded = image_base64_data.split(",", 1)
+        image_data_bytes = base64.b64decode(encoded)
+        img = Image.open(BytesIO(image_data_bytes))
+
+        vision_prompt_instructions = """
+        You are an expert SAT tutor. Analyze the provided image and the user's question about it.
+        If the image contains a question (e.g., a math problem, a graph question), provide a clear, step-by-step solution and explanation.
+        If the user's prompt is a direct question about the image's content, answer it directly and provide an explanation.
+        If it's a multiple-choice question, identify the correct option.
+
+        Respond with:
+        - `ai_answer`: a concise direct answer (e.g., "The correct answer is C", "x=5", or "The function is linear").
+        - `ai_solution`: the full step-by-step solution or explanation, one step or distinct point per array element.
+        - `ai_confidence`: "High", "Medium" or "Low".
+        """
+        return [vision_prompt_instructions, img, user_prompt_text]
+
+    def _image_answer_result(self, answer, error, text_response):
+        if error is not None:
+            print(f"Error decoding JSON from Gemini Vision: {error}")
+            print(f"Raw Gemini Vision response: {text_response}")
+            return {"error": "Failed to parse AI Vision response.", "details": error, "raw_response": text_response}
+        return answer
 
     def analyze_image_question(self, image_base64_data, user_prompt_text):
         try:
-            header, encoded = image_base64_data.split(",", 1)
-            image_data_bytes = base64.b64decode(encoded)
-            img = Image.open(BytesIO(image_data_bytes))
-
-            content = [
-                user_prompt_text,
-                img
-            ]
-
-            vision_prompt_instructions = """
-            You are an expert SAT tutor. Analyze the provided image and the user's question about it.
-            If the image contains a question (e.g., a math problem, a graph question), provide a clear, step-by-step solution and explanation.
-            If the user's prompt is a direct question about the image's content, answer it directly and provide an explanation.
-            If it's a multiple-choice question, identify the correct option.
-
-            Output should be a single JSON object with the following structure:
-            {
-              "ai_answer": string, // A concise direct answer (e.g., "The correct answer is C", "x=5", or "The function is linear").
-              "ai_solution": array of strings, // The full step-by-step solution or detailed explanation, with each step or distinct point as a separate string element in the array.
-              "ai_confidence": string // Optional: "High", "Medium", "Low"
-            }
-
-            EXAMPLE_SOLUTION_ARRAY:
-            [
-              "Step 1: Identify the variables and given information from the image.",
-              "Step 2: Formulate the equations or geometric properties.",
-              "Step 3: Solve the equations/apply principles step-by-step.",
-              "Step 4: State the final answer clearly."
-            ]
-
-            Ensure the output is valid JSON, enclosed in triple backticks, and contains only the JSON.
-            """
-
-            response = self.vision_model.generate_content([vision_prompt_instructions, img, user_prompt_text])
-            text_response = response.text
-            if text_response.startswith("```json") and text_response.endswith("```"):
-                json_string = text_response[7:-3].strip()
-            else:
-                json_string = text_response.strip()
-
-            json_string = _clean_json_string(json_string)
-
-            try:
-                return json.loads(json_string)
-            except json.JSONDecodeError as e:
-                print(f"Error decoding JSON from Gemini Vision: {e}")
-                print(f"Raw Gemini Vision response: {text_response}")
-                return {"error": "Failed to parse AI Vision response.", "details": str(e), "raw_response": text_response}
+            contents = self._image_question_contents(image_base64_data, user_prompt_text)
+            return self._image_answer_result(*self._generate_json('analyze_image_question', contents, model=self.vision_model))
+        except Exception as e:
+            print(f"Error in analyze_image_question: {e}")
+            return {"error": "Image analysis failed.", "details": str(e)}
 
+    async def analyze_image_question_async(self, image_base64_data, user_prompt_text):
+        """Non-blocking variant of analyze_image_question for the ASGI server."""
+        try:
+            contents = self._image_question_contents(image_base64_data, user_prompt_text)
+            return self._image_answer_result(*await self._generate_json_async('analyze_image_question', contents, model=self.vision_model))
         except Exception as e:
             print(f"Error in analyze_image_question: {e}")
             return {"error": "Image analysis failed.", "details": str(e)}
@@ -335,32 +630,18 @@ class GeminiService:
         User ID: {user_id}
         User Input: {user_input}
         {'Specific Topic Area to Focus On: ' + topic_area if topic_area else ''}
-
-        EXAMPLE JSON OUTPUT:
-        ```json
-        {{
-          "Math: Algebra": "intermediate",
-          "Math: Geometry": "needs practice",
-          "Reading: Main Idea": "advanced",
-          "Writing: Essay Structure": "beginner",
-          "Overall Aptitude": "intermediate"
-        }}
-        ```
-
-        Ensure the output is valid JSON, enclosed in triple backticks, and contains only the JSON.
         """
-        try:
-            response = self.text_model.generate_content(prompt)
-            text_response = response.text
-
-            if text_response.startswith("```json") and text_response.endswith("```"):
-                json_string = text_response[7:-3].strip()
-            else:
-                json_string = text_response.strip()
+        cached = self._cache_get('assess_knowledge', prompt)
+        if cached is not None:
+            return cached
 
-            json_string = _clean_json_string(json_string)
-
-            return json.loads(json_string)
+        try:
+            assessment, error, _ = self._generate_json('assess_knowledge', prompt)
+            if error is not None:
+                print(f"Error in assess_knowledge: {error}")
+                return {"error": "Failed to assess knowledge.", "details": error}
+            self._cache_set('assess_knowledge', prompt, assessment)
+            return assessment
         except Exception as e:
             print(f"Error in assess_knowledge: {e}")
             return {"error": "Failed to assess knowledge.", "details": str(e)}
@@ -403,64 +684,29 @@ class GeminiService:
         - If the question_type is 'reading_comprehension', you MUST use the provided context as the passage, formatted within 'passage' field.
         - Provide 'question_text', an array of 'options' (A, B, C, D as strings), 'correct_answer_info' (an object with 'answer' (the correct option string) and 'explanation' (detailed text)).
         - For math questions, include necessary numbers and context within 'question_text'.
+        - If the question_type is not 'reading_comprehension', set 'passage' to null.
+        """
+        cached = self._cache_get('generate_sat_question_from_context', prompt)
+        if cached is not None:
+            return cached
 
-        EXAMPLE JSON FORMAT:
-        ```json
-        {{
-            "passage": "Example passage text here...",
-            "question_text": "Based on the passage, what is the main idea?",
-            "options": [
-                "A) Option A",
-                "B) Option B",
-                "C) Option C",
-                "D) Option D"
-            ],
-            "correct_answer_info": {{
-                "answer": "A) Option A",
-                "explanation": "Detailed explanation here."
-            }}
-        }}
-        ```
-        If the question_type is not 'reading_comprehension', set 'passage' to null.
-
-        Ensure the output is valid JSON, enclosed in triple backticks, and contains ONLY the JSON.
-        """
-        response = self.text_model.generate_content(prompt)
-        text_response = response.text
-        
-        # Extract JSON from triple backticks
-        if text_response.startswith("```json") and text_response.endswith("```"):
-            json_string = text_response[7:-3].strip()
-        else:
-            json_string = text_response.strip()
-
-        # Clean JSON string to remove invalid characters
-        json_string = _clean_json_string(json_string)
-
-        try:
-            return json.loads(json_string)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from Gemini for RAG question generation: {e}")
+        question_data, error, text_response = self._generate_json('generate_sat_question_from_context', prompt)
+        if error is not None:
+            print(f"Error decoding JSON from Gemini for RAG question generation: {error}")
             print(f"Raw Gemini response: {text_response}")
-            return {"error": "Failed to parse AI RAG question response.", "details": str(e), "raw_response": text_response}
+            return {"error": "Failed to parse AI RAG question response.", "details": error, "raw_response": text_response}
+
+        self._cache_set('generate_sat_question_from_context', prompt, question_data)
+        return question_data
 
     # NEW METHOD: start_chat_session
-    def start_chat_session(self, user_id: int, user_profile: dict):
-        """
-        Starts a new chat session with the Gemini model for a specific user,
-        setting up the tutor's persona based on user profile.
-        Returns true if session started, false if already exists.
-        """
-        if user_id in self.active_chat_sessions:
-            print(f"Chat session already active for user {user_id}. Reusing existing session.")
-            return {"message": "Chat session already active for this user."}
-        
-        # Prepare system instructions based on user profile
+    def _tutor_persona(self, user_profile: dict):
+        """The tutor persona and student profile, sent once per session as the system instruction."""
         learning_goals = user_profile.get('learning_goals', [])
         learning_style = user_profile.get('learning_style_preference', 'any')
         knowledge_level = user_profile.get('current_knowledge_level', {})
-        
-        system_instruction_prompt = f"""
+
+        return f"""
         You are an incredibly supportive, knowledgeable, and patient SAT tutor.
         Your goal is to guide the student, clarify concepts, break down problems,
         identify misconceptions, and suggest effective learning strategies and resources.
@@ -468,7 +714,7 @@ class GeminiService:
         The student's profile indicates:
         - Learning Goals: {json.dumps(learning_goals)}
         - Learning Style Preference: {learning_style}
-        - Current Knowledge Level: {json.dumps(knowledge_level, indent=2)}
+        - Current Knowledge Level: {json.dumps(knowledge_level)}
 
         When responding, consider their learning style:
         - For 'visual' learners: Suggest diagrams, flowcharts, or visual examples.
@@ -479,23 +725,40 @@ class GeminiService:
         Always be encouraging and break down complex ideas into understandable parts.
         Do not give direct answers immediately; instead, guide them to the solution with hints or questions.
         If they ask for an explanation for a previously solved problem, explain it step by step.
+        Messages may start with a [Student profile update: ...] note; treat it as a change to the profile above.
+        """
+
+    @staticmethod
+    def _chat_profile_snapshot(user_profile: dict):
+        return {
+            "learning_goals": user_profile.get('learning_goals', []),
+            "learning_style_preference": user_profile.get('learning_style_preference', 'any'),
+            "current_knowledge_level": user_profile.get('current_knowledge_level', {}) or {},
+        }
+
+    def start_chat_session(self, user_id: int, user_profile: dict):
         """
+        Starts a new chat session with the Gemini model for a specific user,
+        setting up the tutor's persona based on user profile.
+        Returns true if session started, false if already exists.
+        """
+        if self._get_chat_session(user_id) is not None:
+            print(f"Chat session already active for user {user_id}. Reusing existing session.")
+            return {"message": "Chat session already active for this user."}
+
+        system_instruction = self._tutor_persona(user_profile)
 
         try:
-            # Initialize chat history with the system instruction as the first user message.
-            # This is a common pattern for models where 'system_instruction' or 'system' role
-            # is not directly supported in start_chat or the history for setting persona,
-            # especially for older versions or specific model configurations.
-            initial_history = [
-                {
-                    "role": "user", # Using 'user' role for the initial system prompt workaround
-                    "parts": [
-                        {"text": system_instruction_prompt}
-                    ]
-                }
-            ]
-            self.active_chat_sessions[user_id] = self.text_model.start_chat(history=initial_history)
-            
+            # The persona goes in as the model's system instruction, so it is sent once per
+            # request rather than accumulating in the history with every turn.
+            session = {
+                "chat": self._new_tutor_chat(system_instruction, []),
+                "system_instruction": system_instruction,
+                "profile": self._chat_profile_snapshot(user_profile),
+                "lock": threading.Lock(),
+            }
+            self._save_chat_session(user_id, session)
+
             print(f"Started new chat session for user {user_id}")
             return {"message": "Chat session started successfully!"}
         except genai.APIError as e:
@@ -507,51 +770,212 @@ class GeminiService:
             print(f"Unexpected error starting chat session for user {user_id}: {e}")
             return {"error": f"Unexpected error starting chat: {str(e)}"}
 
+    def _new_tutor_chat(self, system_instruction, history):
+        if system_instruction is None:
+            return self.text_model.start_chat(history=history)
+        model = genai.GenerativeModel(self.text_model_name, system_instruction=system_instruction)
+        return model.start_chat(history=history)
+
+    def _get_chat_session(self, user_id):
+        """Returns the user's chat session, rebuilding it from stored state if it was evicted."""
+        def restore(state):
+            return {
+                "chat": self._new_tutor_chat(state.get("system_instruction"), state["history"]),
+                "system_instruction": state.get("system_instruction"),
+                "profile": state.get("profile") or {},
+                "lock": threading.Lock(),
+            }
+        return self.chat_sessions.get(user_id, restore)
+
+    def _save_chat_session(self, user_id, session):
+        """Stores the chat session along with a serializable copy of its state."""
+        history = [
+            {"role": content.role, "parts": [{"text": part.text} for part in content.parts if part.text]}
+            for content in session["chat"].history
+        ]
+        state = {"system_instruction": session["system_instruction"], "profile": session["profile"], "history": history}
+        self.chat_sessions.put(user_id, session, state)
+
     # NEW METHOD: send_chat_message
-    def send_chat_message(self, user_id: int, message: str, user_profile: dict):
+    def _chat_turn_prompt(self, message: str, session: dict, user_profile: dict):
         """
-        Sends a message to the active chat session for a user and gets a response.
+        Returns the text to send for this turn and the profile snapshot it reflects.
+        The persona lives in the system instruction, so a turn is just the student's
+        message, prefixed with a compact note only when their profile has changed.
         """
-        chat_session = self.active_chat_sessions.get(user_id)
-        if not chat_session:
-            return {"error": "No active chat session found for this user. Please start a new session."}
+        snapshot = self._chat_profile_snapshot(user_profile)
+        previous = session["profile"]
+
+        delta = {}
+        for key in ("learning_goals", "learning_style_preference"):
+            if snapshot[key] != previous.get(key):
+                delta[key] = snapshot[key]
+        previous_levels = previous.get("current_knowledge_level", {})
+        changed_levels = {
+            topic: level for topic, level in snapshot["current_knowledge_level"].items()
+            if previous_levels.get(topic) != level
+        }
+        if changed_levels:
+            delta["current_knowledge_level"] = changed_levels
 
-        # Dynamically inject relevant user profile context for each turn,
-        # especially for adaptive guidance. This is crucial for maintaining persona.
-        learning_goals = user_profile.get('learning_goals', [])
-        learning_style = user_profile.get('learning_style_preference', 'any')
-        knowledge_level = user_profile.get('current_knowledge_level', {})
+        if not delta:
+            return message, snapshot
+        return f"[Student profile update: {json.dumps(delta)}]\n{message}", snapshot
 
-        # Craft the prompt for this turn, reminding the AI of its role and user context
-        # This approach embeds the "system instruction" with each turn, which is robust
-        # even if start_chat's system_instruction isn't fully utilized or persistent.
-        turn_prompt = f"""
-        You are an incredibly supportive, knowledgeable, and patient SAT tutor.
-        Your goal is to guide the student, clarify concepts, break down problems,
-        identify misconceptions, and suggest effective learning strategies and resources.
+    def _split_chat_history(self, chat_session):
+        """
+        Returns (older, recent) history contents when the conversation is over the token
+        budget, or None. `recent` keeps the last few exchanges verbatim.
+        """
+        history = chat_session.history
+        # Rough estimate of ~4 characters per token; good enough for a budget check
+        estimated_tokens = sum(len(part.text) for content in history for part in content.parts) // 4
+        keep = self.chat_history_recent_messages
+        if estimated_tokens <= self.chat_history_token_budget or len(history) <= keep:
+            return None
+        return history[:-keep], history[-keep:]
+
+    @staticmethod
+    def _chat_summary_prompt(older):
+        transcript = "\n".join(
+            f"{content.role}: {' '.join(part.text for part in content.parts)}" for content in older
+        )
+        return f"""
+        Summarize this SAT tutoring conversation in under 150 words for the tutor's own notes.
+        Keep the problems worked on, the student's misconceptions, what they have understood,
+        and any open questions. Output only the summary.
+
+        {transcript}
+        """
 
-        The student's profile indicates:
-        - Learning Goals: {json.dumps(learning_goals)}
-        - Learning Style Preference: {learning_style}
-        - Current Knowledge Level: {json.dumps(knowledge_level, indent=2)}
+    def _apply_chat_summary(self, chat_session, summary, older):
+        """
+        Replaces the `older` prefix of the history with the summary, keeping every later
+        entry, including turns added while the summary was being generated. Does nothing if
+        the history no longer starts with `older` (e.g. it was rewound or replaced meanwhile).
+        """
+        history = chat_session.history
+        if len(history) < len(older) or any(current is not old for current, old in zip(history, older)):
+            return
+        rest = list(history[len(older):])
+        if summary:
+            chat_session.history = [
+                {"role": "user", "parts": [{"text": f"Summary of our conversation so far: {summary}"}]},
+                {"role": "model", "parts": [{"text": "Thanks, I'll keep that in mind."}]},
+            ] + rest
+        else:
+            # Summarization failed; fall back to dropping the oldest turns
+            chat_session.history = rest
 
-        When responding, consider their learning style:
-        - For 'visual' learners: Suggest diagrams, flowcharts, or visual examples.
-        - For 'auditory' learners: Suggest verbal explanations, analogies, or thinking out loud.
-        - For 'kinesthetic' learners: Suggest interactive problems, hands-on activities, or real-world applications.
-        - For 'reading/writing' learners: Suggest detailed explanations, summaries, or practice writing.
+    @staticmethod
+    @contextlib.asynccontextmanager
+    async def _chat_session_lock_async(session):
+        """
+        Holds the session's lock from async code. It is polled rather than waited on in a
+        thread, so the event loop never blocks and a cancelled waiter never ends up owning it.
+        """
+        lock = session["lock"]
+        while not lock.acquire(blocking=False):
+            await asyncio.sleep(0.01)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def _compact_chat_history(self, user_id, session):
+        """Summarizes older turns once the history exceeds chat_history_token_budget, then saves the session."""
+        chat_session = session["chat"]
+        with session["lock"]:
+            split = self._split_chat_history(chat_session)
+        if split is None:
+            return
+        older, _ = split
+        try:
+            summary = self._generate('summarize_chat_history', self._chat_summary_prompt(older)).text.strip()
+        except Exception as e:
+            print(f"Error summarizing chat history for user {user_id}: {e}")
+            summary = None
+        with session["lock"]:
+            self._apply_chat_summary(chat_session, summary, older)
+            self._save_chat_session(user_id, session)
+
+    async def _compact_chat_history_async(self, user_id, session):
+        chat_session = session["chat"]
+        async with self._chat_session_lock_async(session):
+            split = self._split_chat_history(chat_session)
+        if split is None:
+            return
+        older, _ = split
+        try:
+            response = await self._generate_async('summarize_chat_history', self._chat_summary_prompt(older))
+            summary = response.text.strip()
+        except Exception as e:
+            print(f"Error summarizing chat history for user {user_id}: {e}")
+            summary = None
+        async with self._chat_session_lock_async(session):
+            self._apply_chat_summary(chat_session, summary, older)
+            self._save_chat_session(user_id, session)
 
-        Always be encouraging and break down complex ideas into understandable parts.
-        Do not give direct answers immediately; instead, guide them to the solution with hints or questions.
-        If they ask for an explanation for a previously solved problem, explain it step by step.
+    def _schedule_chat_compaction(self, user_id, session):
+        """
+        Compacts the history on the compaction pool once the reply has been returned, so a
+        turn that crosses the budget doesn't wait on a second model call. At most one
+        compaction runs per session at a time; the history is only read and replaced under
+        the session lock, so a turn finishing meanwhile is never lost.
+        """
+        if session.get("compacting"):
+            return
+        session["compacting"] = True
+
+        def compact():
+            try:
+                self._compact_chat_history(user_id, session)
+            except Exception as e:
+                print(f"Error compacting chat history for user {user_id}: {e}")
+            finally:
+                session["compacting"] = False
+        self._compaction_executor.submit(compact)
+
+    def _schedule_chat_compaction_async(self, user_id, session):
+        """Non-blocking variant of _schedule_chat_compaction, run as a task on the event loop."""
+        if session.get("compacting"):
+            return
+        session["compacting"] = True
+
+        async def compact():
+            try:
+                await self._compact_chat_history_async(user_id, session)
+            except Exception as e:
+                print(f"Error compacting chat history for user {user_id}: {e}")
+            finally:
+                session["compacting"] = False
+        task = asyncio.get_running_loop().create_task(compact())
+        # The event loop keeps only weak references to tasks
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
-        Student's current message: {message}
+    def send_chat_message(self, user_id: int, message: str, user_profile: dict):
+        """
+        Sends a message to the active chat session for a user and gets a response.
         """
+        session = self._get_chat_session(user_id)
+        if not session:
+            return {"error": "No active chat session found for this user. Please start a new session."}
+
+        turn_prompt, profile = self._chat_turn_prompt(message, session, user_profile)
 
         try:
             # Use the .send_message method of the chat session
             # This maintains the conversation history internally for Gemini.
-            response = chat_session.send_message(turn_prompt)
+            # The session lock serializes turns with each other and with history compaction.
+            with session["lock"]:
+                response = self._call_upstream('send_chat_message', lambda timeout: session["chat"].send_message(
+                    turn_prompt, request_options={"timeout": timeout}
+                ))
+                session["profile"] = profile
+                self._save_chat_session(user_id, session)
+            # History compaction runs after the reply has been returned
+            self._schedule_chat_compaction(user_id, session)
             return {"ai_response": response.text}
         except genai.APIError as e:
             print(f"Gemini API Error sending chat message for user {user_id}: {e}")
@@ -559,7 +983,84 @@ class GeminiService:
         except Exception as e:
             print(f"Unexpected error sending chat message for user {user_id}: {e}")
             return {"error": f"Failed to get AI response: {str(e)}"}
-        
+
+    def stream_chat_message(self, user_id: int, message: str, user_profile: dict):
+        """
+        Streaming variant of send_chat_message. Yields {"chunk": text} events as Gemini
+        produces tokens, then one final {"ai_response": full_text} event, or an
+        {"error": ...} event. The exchange is recorded in the chat session's history
+        once the stream has been fully consumed.
+        """
+        session = self._get_chat_session(user_id)
+        if not session:
+            yield {"error": "No active chat session found for this user. Please start a new session."}
+            return
+
+        chat_session = session["chat"]
+        turn_prompt, profile = self._chat_turn_prompt(message, session, user_profile)
+
+        # Held until the stream ends: the turn is pending in the ChatSession until then,
+        # and compaction replacing the history meanwhile would drop it
+        session["lock"].acquire()
+        stream_opened = False
+        completed = False
+        try:
+            # Timed until the last chunk arrives; usage_metadata is complete only then.
+            # Only opening the stream is retried: once chunks have reached the client,
+            # a failure ends the reply with an error event.
+            with self.metrics.track_call('stream_chat_message') as call:
+                response = self.resilience.call('stream_chat_message', lambda timeout: chat_session.send_message(
+                    turn_prompt, stream=True, request_options={"timeout": timeout}
+                ), self._deadline('stream_chat_message'))
+                stream_opened = True
+                chunks = []
+                for chunk in response:
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                        yield {"chunk": chunk.text}
+                call.record_usage(response)
+            completed = True
+            session["profile"] = profile
+            self._save_chat_session(user_id, session)
+            yield {"ai_response": "".join(chunks)}
+        except Exception as e:
+            print(f"Error streaming chat message for user {user_id}: {e}")
+            yield {"error": f"Failed to get AI response: {str(e)}"}
+        finally:
+            # Drop the half-finished turn (error or client disconnect mid-stream) so the
+            # session can keep accepting messages. When send_message itself failed, the
+            # session recorded nothing, and rewind() would pop the previous exchange.
+            if stream_opened and not completed:
+                try:
+                    chat_session.rewind()
+                except Exception:
+                    pass
+            session["lock"].release()
+
+        if completed:
+            # History compaction runs in the background, so closing the stream doesn't wait on it
+            self._schedule_chat_compaction(user_id, session)
+
+    async def send_chat_message_async(self, user_id: int, message: str, user_profile: dict):
+        """Non-blocking variant of send_chat_message for the ASGI server."""
+        session = self._get_chat_session(user_id)
+        if not session:
+            return {"error": "No active chat session found for this user. Please start a new session."}
+
+        turn_prompt, profile = self._chat_turn_prompt(message, session, user_profile)
+
+        try:
+            async with self._chat_session_lock_async(session):
+                response = await self._call_upstream_async('send_chat_message', lambda timeout: session["chat"].send_message_async(
+                    turn_prompt, request_options={"timeout": timeout}
+                ))
+                session["profile"] = profile
+                self._save_chat_session(user_id, session)
+            self._schedule_chat_compaction_async(user_id, session)
+            return {"ai_response": response.text}
+        except Exception as e:
+            print(f"Error sending chat message for user {user_id}: {e}")
+            return {"error": f"Failed to get AI response: {str(e)}"}
 
     def simulate_interview(self, user_id: int, simulation_type: str, user_input: str, chat_history: list = None):
         """
@@ -583,7 +1084,7 @@ class GeminiService:
         full_prompt_parts.append({"role": "user", "parts": [user_input]}) 
 
         try:
-            response = self.text_model.generate_content(full_prompt_parts)
+            response = self._generate('simulate_interview', full_prompt_parts)
             return {"simulation_response": response.text}
         except Exception as e:
             print(f"Error in simulate_interview: {e}")
@@ -605,46 +1106,30 @@ class GeminiService:
         Term: "{term}"
         Example Sentence:
         """
+        cached = self._cache_get('generate_example_sentence_for_word', prompt)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.text_model.generate_content(prompt)
+            text = self._coalesced('generate_example_sentence_for_word', prompt, lambda: self._generate('generate_example_sentence_for_word', prompt).text)
             # Assuming the response text directly contains the sentence.
             # Add error handling or more sophisticated parsing if Gemini's output is more complex.
-            sentence = response.text.strip()
+            sentence = text.strip()
 
             # Basic validation or cleaning if needed
             if not sentence or len(sentence) < 5: # Arbitrary minimum length
                 raise ValueError("Generated sentence is too short or empty.")
 
+            self._cache_set('generate_example_sentence_for_word', prompt, sentence)
             return sentence
         except Exception as e:
             print(f"Error generating example sentence for '{term}': {e}")
             # Fallback or re-throw as appropriate
             return f"Could not generate an example sentence for '{term}' at this time. Error: {str(e)}"
 
-    def analyze_essay(self, essay_text: str, essay_prompt_description: str = ""):
-        """
-        Analyzes an essay based on SAT scoring criteria using Gemini.
-        Returns structured feedback in JSON format.
-        """
+    def _essay_prompt(self, essay_text: str, essay_prompt_description: str):
         prompt_context = f"The essay was written in response to the following prompt/topic: '{essay_prompt_description}'" if essay_prompt_description else "The essay was self-prompted or the specific prompt is not provided."
 
-        json_feedback_structure_example = """
-        {
-          "overall_score": "4/6",
-          "strengths": ["Clear thesis statement.", "Good use of examples related to the prompt."],
-          "areas_for_improvement": ["Needs more in-depth analysis in paragraph 2.", "Some awkward phrasing and grammatical errors."],
-          "detailed_feedback": [
-            {"category": "Reading/Understanding", "score": "5/6", "comment": "Student demonstrates a good understanding of the prompt/passage."},
-            {"category": "Analysis", "score": "4/6", "comment": "The analysis is on the right track but could be more profound. For instance, consider the counterarguments or alternative interpretations."},
-            {"category": "Development/Support", "score": "3/6", "comment": "While examples are provided, they need to be more thoroughly explained and connected back to the main thesis. Some claims lack sufficient evidence."},
-            {"category": "Organization/Cohesion", "score": "4/6", "comment": "The essay follows a logical structure, but transitions between paragraphs could be smoother to improve flow."},
-            {"category": "Language Use", "score": "3/6", "comment": "Vocabulary is generally appropriate, but there are instances of imprecise word choice. Sentence structures could be more varied."},
-            {"category": "Grammar, Usage, & Mechanics", "score": "3/6", "comment": "Several grammatical errors (e.g., subject-verb agreement, tense consistency) and some punctuation mistakes were noted. Careful proofreading is recommended."}
-          ],
-          "general_comments": "This is a solid attempt that addresses the core aspects of the prompt. To improve, focus on deepening the analysis, providing more robust support for your claims, and refining language precision and grammatical accuracy."
-        }
-        """
-
         prompt = f"""
         You are an expert SAT Essay Grader.
         Please evaluate the following student essay based on standard SAT essay scoring criteria.
@@ -665,47 +1150,59 @@ class GeminiService:
             * `comment`: Specific feedback for that category.
         5.  `general_comments`: A brief overall summary or concluding remarks.
 
-        Example of the desired JSON structure:
-        ```json
-        {json_feedback_structure_example}
-        ```
-
         Focus on providing constructive, actionable feedback that will help the student improve their essay writing skills for the SAT.
-        Ensure the output is a single, valid JSON object enclosed in triple backticks.
         """
+        return prompt
 
-        try:
-            response = self.text_model.generate_content(prompt)
-            text_response = response.text
-
-            # Clean the response to extract JSON
-            if text_response.startswith("```json") and text_response.endswith("```"):
-                json_string = text_response[7:-3].strip()
-            elif text_response.startswith("```") and text_response.endswith("```"): # Handle cases with just ```
-                json_string = text_response[3:-3].strip()
-            else:
-                json_string = text_response.strip()
-
-            json_string = _clean_json_string(json_string) # Remove invalid characters
-
-            # Attempt to parse the JSON
-            feedback_json = json.loads(json_string)
-            return feedback_json
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from Gemini for essay analysis: {e}")
+    def _essay_feedback_result(self, feedback, error, text_response):
+        if error is not None:
+            print(f"Error decoding JSON from Gemini for essay analysis: {error}")
             print(f"Raw Gemini response: {text_response}")
             # Fallback: Try to return at least some part of the text if JSON parsing fails
             return {
                 "error": "Failed to parse AI response as JSON.",
-                "details": str(e),
+                "details": error,
                 "raw_feedback_text": text_response,
                 "general_comments": "The AI provided feedback, but it was not in the expected structured format. Please review the raw text above. Common issues include overly complex language or unexpected formatting in the essay itself that can confuse the AI's JSON generation.",
                 "overall_score": "N/A",
                 "strengths": [],
                 "areas_for_improvement": []
             }
+        return feedback
+
+    def analyze_essay(self, essay_text: str, essay_prompt_description: str = ""):
+        """
+        Analyzes an essay based on SAT scoring criteria using Gemini.
+        Returns structured feedback in JSON format.
+        """
+        prompt = self._essay_prompt(essay_text, essay_prompt_description)
+        cached = self._cache_get('analyze_essay', prompt)
+        if cached is not None:
+            return cached
+
+        try:
+            feedback_json = self._essay_feedback_result(*self._generate_json('analyze_essay', prompt))
         except Exception as e:
             print(f"Unexpected error in analyze_essay: {e}")
             return {"error": "An unexpected error occurred during essay analysis.", "details": str(e)}
 
+        if "error" not in feedback_json:
+            self._cache_set('analyze_essay', prompt, feedback_json)
+        return feedback_json
+
+    async def analyze_essay_async(self, essay_text: str, essay_prompt_description: str = ""):
+        """Non-blocking variant of analyze_essay for the ASGI server."""
+        prompt = self._essay_prompt(essay_text, essay_prompt_description)
+        cached = self._cache_get('analyze_essay', prompt)
+        if cached is not None:
+            return cached
+
+        try:
+            feedback_json = self._essay_feedback_result(*await self._generate_json_async('analyze_essay', prompt))
+        except Exception as e:
+            print(f"Unexpected error in analyze_essay: {e}")
+            return {"error": "An unexpected error occurred during essay analysis.", "details": str(e)}
 
+        if "error" not in feedback_json:
+            self._cache_set('analyze_essay', prompt, feedback_json)
+        return feedback_json
@@ -0,0 +1,141 @@
+# backend/services/metrics.py
+
+import threading
+import time
+from collections import defaultdict
+
+# Upper bounds (seconds) of the Gemini call latency histogram buckets
+DEFAULT_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _CallRecorder:
+    """Context manager returned by MetricsRegistry.track_call(); times one Gemini call."""
+
+    def __init__(self, registry, method):
+        self._registry = registry
+        self._method = method
+        self._response = None
+
+    def record_usage(self, response):
+        """Remembers the response so its usage_metadata token counts are recorded on exit."""
+        self._response = response
+
+    def __enter__(self):
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = "ok" if exc_type is None else "error"
+        self._registry.observe_call(self._method, time.perf_counter() - self._started_at, outcome, self._response)
+        return False
+
+
+class MetricsRegistry:
+    """
+    In-process counters and latency histograms for Gemini calls, rendered in the
+    Prometheus text exposition format by render(). Everything is labelled by the
+    GeminiService method that made the call.
+    """
+
+    def __init__(self, latency_buckets=DEFAULT_LATENCY_BUCKETS):
+        self.latency_buckets = tuple(latency_buckets)
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)         # (method, outcome) -> count
+        self._latency_counts = {}                 # method -> per-bucket counts (+Inf last)
+        self._latency_sum = defaultdict(float)    # method -> total seconds
+        self._prompt_tokens = defaultdict(int)    # method -> tokens
+        self._response_tokens = defaultdict(int)  # method -> tokens
+        self._parse_failures = defaultdict(int)   # method -> count
+        self._retries = defaultdict(int)          # method -> count
+        self._collectors = []
+
+    def track_call(self, method):
+        """Usage: `with metrics.track_call("assess_knowledge") as call: ...; call.record_usage(response)`."""
+        return _CallRecorder(self, method)
+
+    def observe_call(self, method, duration_seconds, outcome="ok", response=None):
+        prompt_tokens, response_tokens = self._usage_tokens(response)
+        with self._lock:
+            self._requests[(method, outcome)] += 1
+            counts = self._latency_counts.setdefault(method, [0] * (len(self.latency_buckets) + 1))
+            for i, upper_bound in enumerate(self.latency_buckets):
+                if duration_seconds <= upper_bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._latency_sum[method] += duration_seconds
+            self._prompt_tokens[method] += prompt_tokens
+            self._response_tokens[method] += response_tokens
+
+    def record_parse_failure(self, method):
+        with self._lock:
+            self._parse_failures[method] += 1
+
+    def record_retry(self, method):
+        with self._lock:
+            self._retries[method] += 1
+
+    def add_collector(self, collector):
+        """
+        Registers a callable returning a list of (name, help, value) gauges that are
+        read at render time, e.g. cache or session store statistics.
+        """
+        self._collectors.append(collector)
+
+    @staticmethod
+    def _usage_tokens(response):
+        usage = getattr(response, "usage_metadata", None) if response is not None else None
+        if usage is None:
+            return 0, 0
+        return getattr(usage, "prompt_token_count", 0) or 0, getattr(usage, "candidates_token_count", 0) or 0
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def counter(name, help_text, values, label_names):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(values.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                lines.append(f"{name}{_format_labels(zip(label_names, key))} {value}")
+
+        with self._lock:
+            counter("gemini_requests_total", "Gemini calls by method and outcome.", self._requests, ("method", "outcome"))
+
+            lines.append("# HELP gemini_request_duration_seconds Latency of Gemini calls by method.")
+            lines.append("# TYPE gemini_request_duration_seconds histogram")
+            for method in sorted(self._latency_counts):
+                counts = self._latency_counts[method]
+                cumulative = 0
+                for upper_bound, count in zip(self.latency_buckets + ("+Inf",), counts):
+                    cumulative += count
+                    labels = _format_labels([("method", method), ("le", upper_bound)])
+                    lines.append(f"gemini_request_duration_seconds_bucket{labels} {cumulative}")
+                method_label = _format_labels([("method", method)])
+                lines.append(f"gemini_request_duration_seconds_sum{method_label} {self._latency_sum[method]}")
+                lines.append(f"gemini_request_duration_seconds_count{method_label} {cumulative}")
+
+            counter("gemini_prompt_tokens_total", "Prompt tokens reported by usage_metadata.", self._prompt_tokens, ("method",))
+            counter("gemini_response_tokens_total", "Response tokens reported by usage_metadata.", self._response_tokens, ("method",))
+            counter("gemini_json_parse_failures_total", "Gemini responses that could not be parsed as JSON.", self._parse_failures, ("method",))
+            counter("gemini_retries_total", "Gemini calls retried after a failure.", self._retries, ("method",))
+
+        for collector in self._collectors:
+            for name, help_text, value in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
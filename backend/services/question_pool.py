@@ -0,0 +1,114 @@
+# backend/services/question_pool.py
+
+import json
+import threading
+from sqlalchemy.exc import IntegrityError
+from models import db, PooledQuestion, UserPooledQuestion
+
+
+class QuestionPool:
+    """
+    Inventory of pre-generated SAT questions, bucketed by (topic, difficulty, question_type).
+    Only buckets registered at startup (the mock-test sections) are pooled: requests take
+    questions from them, and a background worker keeps the number of never-served questions
+    in each at or above `low_water_mark`. Any other topic is generated live by the caller,
+    so client-supplied topics never turn into standing Gemini spend.
+    """
+
+    def __init__(self, app, gemini_service, low_water_mark=5, refill_interval_seconds=30):
+        self.app = app
+        self.gemini_service = gemini_service
+        self.low_water_mark = low_water_mark
+        self.refill_interval_seconds = refill_interval_seconds
+        self._buckets = set()
+        self._buckets_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._worker = None
+
+    def register_bucket(self, topic, difficulty, question_type):
+        """Makes this bucket poolable and has the refill worker keep it stocked."""
+        with self._buckets_lock:
+            self._buckets.add((topic, difficulty, question_type))
+
+    def has_bucket(self, topic, difficulty, question_type):
+        with self._buckets_lock:
+            return (topic, difficulty, question_type) in self._buckets
+
+    def start(self):
+        """
+        Starts the background refill worker thread (once). Called by the serving entrypoint
+        rather than on import, so CLI commands and reloader parents don't run it.
+        """
+        if self._worker is not None:
+            return
+        self._worker = threading.Thread(target=self.run, name="question-pool-refill", daemon=True)
+        self._worker.start()
+
+    def take(self, topic, difficulty, question_type, user_id=None, count=1):
+        """
+        Returns up to `count` pooled questions for the bucket that `user_id` has not been
+        served before (least-served first). Must be called inside an app context.
+        May return fewer than `count` questions, and none for unregistered buckets; the
+        caller generates the rest live.
+        """
+        if not self.has_bucket(topic, difficulty, question_type):
+            return []
+
+        query = PooledQuestion.query.filter_by(topic=topic, difficulty=difficulty, question_type=question_type)
+        if user_id:
+            already_served = db.session.query(UserPooledQuestion.pooled_question_id).filter_by(user_id=user_id)
+            query = query.filter(~PooledQuestion.id.in_(already_served))
+        pooled_questions = query.order_by(PooledQuestion.times_served.asc(), PooledQuestion.id.asc()).limit(count).all()
+
+        if pooled_questions:
+            try:
+                for pooled_question in pooled_questions:
+                    pooled_question.times_served = PooledQuestion.times_served + 1
+                    if user_id:
+                        db.session.add(UserPooledQuestion(user_id=user_id, pooled_question_id=pooled_question.id))
+                db.session.commit()
+            except IntegrityError:
+                # Another request served the same question to this user concurrently.
+                db.session.rollback()
+                pooled_questions = []
+
+        if len(pooled_questions) < count or self._unserved_count(topic, difficulty, question_type) < self.low_water_mark:
+            self._wake_event.set()
+
+        return [pooled_question.to_question_dict() for pooled_question in pooled_questions]
+
+    def _unserved_count(self, topic, difficulty, question_type):
+        return PooledQuestion.query.filter_by(topic=topic, difficulty=difficulty, question_type=question_type, times_served=0).count()
+
+    def run(self):
+        """Refills the pool every `refill_interval_seconds`, or sooner when woken by take(). Never returns."""
+        while True:
+            self._wake_event.wait(self.refill_interval_seconds)
+            self._wake_event.clear()
+            try:
+                with self.app.app_context():
+                    self.refill()
+            except Exception as e:
+                print(f"Error refilling question pool: {e}")
+
+    def refill(self):
+        """Tops up every registered bucket to the low-water mark. Must be called inside an app context."""
+        with self._buckets_lock:
+            buckets = list(self._buckets)
+
+        for topic, difficulty, question_type in buckets:
+            deficit = self.low_water_mark - self._unserved_count(topic, difficulty, question_type)
+            if deficit <= 0:
+                continue
+
+            # A separate variant namespace keeps pool questions from being coalesced with a live
+            # request, whose student would otherwise later be served the same question from the pool
+            generated_questions = self.gemini_service.generate_sat_questions(topic, difficulty, question_type, count=deficit, variant_namespace="pool")
+            new_questions = [
+                PooledQuestion(topic=topic, difficulty=difficulty, question_type=question_type, question_json=json.dumps(question_data))
+                for question_data in generated_questions
+                if "error" not in question_data
+            ]
+            db.session.add_all(new_questions)
+            db.session.commit()
+            print(f"Question pool: added {len(new_questions)}/{deficit} questions to bucket ({topic}, {difficulty}, {question_type}).")
@@ -0,0 +1,244 @@
+# backend/services/resilience.py
+
+import asyncio
+import random
+import threading
+import time
+from google.api_core import exceptions as google_exceptions
+
+# Upstream errors worth another attempt: rate limiting (429), overload/unavailability
+# (500/503/504) and network-level timeouts. Anything else (bad request, auth, safety
+# blocks) fails immediately and does not count against the circuit breaker.
+RETRYABLE_EXCEPTIONS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+    asyncio.TimeoutError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: allows `rate_per_second` calls on average with bursts of
+    up to `burst`. Callers reserve a token and sleep until it becomes available, so
+    waiting callers are served in order.
+    """
+
+    def __init__(self, rate_per_second, burst=None):
+        self.rate_per_second = rate_per_second
+        self.burst = burst or max(1, int(rate_per_second))
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=None):
+        """
+        Takes a token and returns how many seconds to wait before using it. Raises
+        TimeoutError, without taking a token, if the wait would exceed `max_wait`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate_per_second)
+            self._updated_at = now
+            wait = max(0.0, (1 - self._tokens) / self.rate_per_second)
+            if max_wait is not None and wait > max_wait:
+                raise TimeoutError(f"Rate limiter wait of {wait:.1f}s exceeds the remaining deadline.")
+            self._tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive upstream failures and rejects calls for
+    `reset_timeout_seconds`. After that a single trial call is let through (half-open):
+    success closes the circuit again, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def before_call(self):
+        """Raises CircuitOpenError if the call must not go upstream right now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self._stats["rejected"] += 1
+            raise CircuitOpenError("Gemini is currently unavailable; please try again shortly.")
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats["opened"] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def release_trial(self):
+        """Lets another call try the half-open circuit when a trial ended without a verdict."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            # 0 = closed, 1 = half-open, 2 = open, so the state can be exported as a gauge
+            stats["state"] = (self.CLOSED, self.HALF_OPEN, self.OPEN).index(self._state)
+            stats["consecutive_failures"] = self._consecutive_failures
+        return stats
+
+
+class ResilientCaller:
+    """
+    Runs upstream calls through the rate limiter and circuit breaker, retrying retryable
+    errors with jittered exponential backoff until `max_attempts` or the call's deadline
+    is used up. The wrapped function receives the seconds left until the deadline so it
+    can pass them on as the request timeout; an attempt that would get less than
+    `min_attempt_seconds` is not made and raises TimeoutError instead.
+    """
+
+    def __init__(self, max_attempts=4, base_delay_seconds=0.5, max_delay_seconds=8.0, rate_limiter=None, circuit_breaker=None, on_retry=None, min_attempt_seconds=0.5):
+        self.max_attempts = max_attempts
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.min_attempt_seconds = min_attempt_seconds
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        # Called with the method name before every retry, e.g. to count retries in metrics
+        self.on_retry = on_retry
+
+    def _backoff_delay(self, attempt):
+        """Full jitter: a random delay up to base * 2^attempt, capped at max_delay_seconds."""
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** attempt))
+
+    def _admit(self, deadline):
+        """
+        Circuit breaker check and rate limiter reservation. Returns the seconds to wait
+        for the rate limiter; raises CircuitOpenError or, if that wait would leave less
+        than `min_attempt_seconds` before `deadline`, TimeoutError.
+        """
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_call()
+        if self.rate_limiter is None:
+            return 0.0
+        try:
+            return self.rate_limiter.reserve(max_wait=max(0.0, deadline - time.monotonic() - self.min_attempt_seconds))
+        except TimeoutError:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.release_trial()
+            raise
+
+    def _attempt_timeout(self, method_name, deadline):
+        """
+        Seconds left for the upstream call after the rate limiter wait. Raises TimeoutError
+        rather than starting a call with (close to) no time left, which some transports
+        reject outright and others treat as no timeout at all.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining < self.min_attempt_seconds:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.release_trial()
+            raise TimeoutError(f"{method_name}: only {max(0.0, remaining):.2f}s of the deadline left for the upstream call")
+        return remaining
+
+    def _record_outcome(self, error):
+        if self.circuit_breaker is None:
+            return
+        if error is None:
+            self.circuit_breaker.record_success()
+        elif isinstance(error, RETRYABLE_EXCEPTIONS):
+            self.circuit_breaker.record_failure()
+        else:
+            # The upstream answered; the request itself was bad
+            self.circuit_breaker.release_trial()
+
+    def _next_delay(self, method_name, attempt, error, deadline):
+        """Seconds to sleep before the next attempt, or None if `error` should be raised."""
+        if not isinstance(error, RETRYABLE_EXCEPTIONS) or attempt + 1 >= self.max_attempts:
+            return None
+        delay = self._backoff_delay(attempt)
+        if time.monotonic() + delay + self.min_attempt_seconds > deadline:
+            return None
+        print(f"Retrying {method_name} in {delay:.2f}s after error: {error}")
+        if self.on_retry is not None:
+            self.on_retry(method_name)
+        return delay
+
+    def call(self, method_name, func, deadline_seconds):
+        deadline = time.monotonic() + deadline_seconds
+        for attempt in range(self.max_attempts):
+            time.sleep(self._admit(deadline))
+            remaining = self._attempt_timeout(method_name, deadline)
+            try:
+                result = func(remaining)
+            except Exception as e:
+                self._record_outcome(e)
+                delay = self._next_delay(method_name, attempt, e, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._record_outcome(None)
+            return result
+
+    async def call_async(self, method_name, func, deadline_seconds):
+        """Non-blocking variant of call; `func` returns an awaitable."""
+        deadline = time.monotonic() + deadline_seconds
+        for attempt in range(self.max_attempts):
+            await asyncio.sleep(self._admit(deadline))
+            remaining = self._attempt_timeout(method_name, deadline)
+            try:
+                result = await asyncio.wait_for(func(remaining), timeout=remaining)
+            except Exception as e:
+                self._record_outcome(e)
+                delay = self._next_delay(method_name, attempt, e, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._record_outcome(None)
+            return result
+
+    def stats(self):
+        stats = {}
+        if self.circuit_breaker is not None:
+            stats.update({f"circuit_{name}": value for name, value in self.circuit_breaker.stats().items()})
+        return stats
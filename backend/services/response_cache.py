@@ -0,0 +1,84 @@
+# backend/services/response_cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(model_name, prompt, generation_params=None):
+    """Hashes (model name, whitespace-normalized prompt, generation params) into a cache key."""
+    normalized_prompt = " ".join(prompt.split())
+    key_material = json.dumps([model_name, normalized_prompt, generation_params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for Gemini results: an in-memory LRU in front of an optional SQLite file.
+    Values must be JSON-serializable; they are stored serialized, so every get() returns a
+    fresh copy that callers may modify. Every entry carries its own TTL.
+    """
+
+    def __init__(self, max_entries=1024, sqlite_path=None):
+        self.max_entries = max_entries
+        self._memory = OrderedDict() # Maps key to (expires_at, serialized value)
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "sqlite_hits": 0, "misses": 0, "sets": 0}
+
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._db.execute("DELETE FROM response_cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def get(self, key):
+        """Returns the cached value, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, serialized = entry
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return json.loads(serialized)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] >= now:
+                    self._remember(key, row[1], row[0])
+                    self._stats["sqlite_hits"] += 1
+                    return json.loads(row[0])
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key, value, ttl_seconds):
+        expires_at = time.time() + ttl_seconds
+        serialized = json.dumps(value)
+        with self._lock:
+            self._remember(key, expires_at, serialized)
+            self._stats["sets"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, serialized, expires_at)
+                )
+                self._db.commit()
+
+    def _remember(self, key, expires_at, serialized):
+        self._memory[key] = (expires_at, serialized)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        return stats
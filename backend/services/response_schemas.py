@@ -0,0 +1,106 @@
+# backend/services/response_schemas.py
+#
+# Expected shape of each JSON-returning GeminiService method, written in the Gemini
+# response_schema dialect (upper-case types). They are sent to Gemini as the
+# response_schema in native JSON mode, and structured_output.validate() checks the
+# responses against them; only fields the app actually relies on are required.
+
+_STRING = {"type": "STRING"}
+_STRING_LIST = {"type": "ARRAY", "items": _STRING}
+
+SAT_QUESTION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "passage": {"type": "STRING", "nullable": True},
+        "question_text": _STRING,
+        "options": {"type": "ARRAY", "items": _STRING, "nullable": True},
+        "correct_answer_info": {
+            "type": "OBJECT",
+            "properties": {"answer": _STRING, "explanation": _STRING},
+            "required": ["answer", "explanation"],
+        },
+    },
+    "required": ["question_text", "correct_answer_info"],
+}
+
+EVALUATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "is_correct": {"type": "BOOLEAN"},
+        "feedback_summary": _STRING,
+        "personal_feedback": _STRING,
+        "explanation_comparison": _STRING,
+        "common_misconceptions": {"type": "STRING", "nullable": True},
+        "correct_explanation_reiteration": _STRING_LIST,
+        "next_steps_suggestion": _STRING_LIST,
+        "visual_aid_suggestion": {"type": "STRING", "nullable": True},
+        "topic_sub_skills_evaluated": _STRING_LIST,
+        "misconceptions_identified": _STRING_LIST,
+    },
+    "required": ["is_correct", "feedback_summary"],
+}
+
+EVALUATION_LIST_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": dict(EVALUATION_SCHEMA["properties"], index={"type": "INTEGER"}),
+        "required": ["index", "is_correct", "feedback_summary"],
+    },
+}
+
+STUDY_PLAN_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": _STRING,
+        "recommended_topics": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "topic_name": _STRING,
+                    "reason": _STRING,
+                    "suggested_resource_types": _STRING_LIST,
+                    "target_difficulty": _STRING,
+                },
+                "required": ["topic_name"],
+            },
+        },
+        "practice_strategies": _STRING_LIST,
+        "study_tips": _STRING_LIST,
+        "motivational_message": _STRING,
+    },
+    "required": ["summary"],
+}
+
+# Topic names are chosen by the model, so only the object type can be checked
+KNOWLEDGE_ASSESSMENT_SCHEMA = {"type": "OBJECT"}
+
+IMAGE_ANSWER_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "ai_answer": _STRING,
+        "ai_solution": _STRING_LIST,
+        "ai_confidence": _STRING,
+    },
+    "required": ["ai_answer", "ai_solution"],
+}
+
+ESSAY_FEEDBACK_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "overall_score": _STRING,
+        "strengths": _STRING_LIST,
+        "areas_for_improvement": _STRING_LIST,
+        "detailed_feedback": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {"category": _STRING, "score": _STRING, "comment": _STRING},
+                "required": ["category", "comment"],
+            },
+        },
+        "general_comments": _STRING,
+    },
+    "required": ["overall_score", "strengths", "areas_for_improvement"],
+}
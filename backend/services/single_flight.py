@@ -0,0 +1,89 @@
+# backend/services/single_flight.py
+
+import asyncio
+import copy
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with the same key: the first caller (the leader) runs
+    the function, callers arriving while it is in flight wait for it. Every caller
+    receives its own deep copy of the result, or the exception. Nothing is remembered once the call finishes;
+    caching completed results is ResponseCache's job.
+    """
+
+    def __init__(self):
+        self._calls = {}        # key -> _Call, for threads
+        self._async_calls = {}  # key -> asyncio.Future, for the event loop
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "followers": 0}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+                self._stats["leaders"] += 1
+            else:
+                self._stats["followers"] += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        # Every caller gets its own copy, so none can change what the others see
+        return copy.deepcopy(call.result)
+
+    async def do_async(self, key, func):
+        """Non-blocking variant of do; `func` returns an awaitable."""
+        future = self._async_calls.get(key)
+        if future is not None:
+            with self._lock:
+                self._stats["followers"] += 1
+            # Shielded so a follower being cancelled does not cancel the leader's call
+            return copy.deepcopy(await asyncio.shield(future))
+
+        future = self._async_calls[key] = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._stats["leaders"] += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody was waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return copy.deepcopy(result)
+        finally:
+            del self._async_calls[key]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls) + len(self._async_calls)
+        return stats
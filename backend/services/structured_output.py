@@ -0,0 +1,167 @@
+# backend/services/structured_output.py
+
+import json
+import re
+
+# Control characters that are never valid in JSON text, outside or inside strings
+_INVALID_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\u0080-\u009F]')
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+
+class JsonExtractor:
+    """
+    Finds the first balanced JSON object or array in model output that may be wrapped
+    in prose or ``` fences. Text can be fed in chunks as it streams in; feed() returns
+    True once the top-level value is complete, and text() returns it.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escaped = False
+        self.complete = False
+
+    def feed(self, chunk):
+        for char in chunk:
+            if self.complete:
+                break
+            if not self._started:
+                if char in '{[':
+                    self._started = True
+                    self._depth = 1
+                    self._buffer.append(char)
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+        return self.complete
+
+    def text(self):
+        """The extracted JSON text; partial if the value never closed."""
+        return "".join(self._buffer)
+
+
+def extract_json_text(text):
+    """Returns the first balanced JSON object/array in `text`, or None if there is none."""
+    extractor = JsonExtractor()
+    extractor.feed(text)
+    json_text = extractor.text()
+    return json_text or None
+
+
+def _load_json(json_text):
+    try:
+        return json.loads(json_text)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(json_text))
+
+
+def repair_json(json_text):
+    """
+    Fixes the defects Gemini most often produces: stray control characters, raw
+    newlines/tabs inside strings and trailing commas before a closing bracket.
+    """
+    repaired = []
+    in_string = False
+    escaped = False
+    for char in _INVALID_CONTROL_CHARS.sub('', json_text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == '\n':
+                char = '\\n'
+            elif char == '\r':
+                char = '\\r'
+            elif char == '\t':
+                char = '\\t'
+        elif char == '"':
+            in_string = True
+        repaired.append(char)
+    return _TRAILING_COMMA.sub(r'\1', "".join(repaired))
+
+
+_SCHEMA_TYPES = {
+    "OBJECT": dict,
+    "ARRAY": list,
+    "STRING": str,
+    "BOOLEAN": bool,
+    "INTEGER": int,
+    "NUMBER": (int, float),
+}
+
+
+def validate(value, schema, path="$"):
+    """
+    Checks `value` against a Gemini response_schema style dict ("type" in upper case,
+    "properties", "required", "items", "nullable"). Returns a list of problems, empty
+    if the value conforms. Properties that are not declared are allowed.
+    """
+    if value is None:
+        return [] if schema.get("nullable") else [f"{path} is null"]
+
+    expected_type = schema.get("type")
+    if expected_type:
+        python_type = _SCHEMA_TYPES[expected_type]
+        # bool is a subclass of int, but true/false is never a valid number here
+        if not isinstance(value, python_type) or (expected_type in ("INTEGER", "NUMBER") and isinstance(value, bool)):
+            return [f"{path} should be {expected_type.lower()}, got {type(value).__name__}"]
+
+    problems = []
+    if expected_type == "OBJECT":
+        for key in schema.get("required", []):
+            if key not in value:
+                problems.append(f"{path}.{key} is missing")
+        for key, property_schema in schema.get("properties", {}).items():
+            if key in value:
+                problems.extend(validate(value[key], property_schema, f"{path}.{key}"))
+    elif expected_type == "ARRAY" and "items" in schema:
+        for index, item in enumerate(value):
+            problems.extend(validate(item, schema["items"], f"{path}[{index}]"))
+    return problems
+
+
+def parse_structured_output(text, schema=None):
+    """
+    Extracts, repairs and validates the JSON value in a model response.
+    Returns (value, None) on success or (None, reason) on failure.
+    """
+    text = text or ""
+    json_text = extract_json_text(text)
+    if json_text is None:
+        return None, "no JSON object or array found in the response"
+
+    try:
+        value = _load_json(json_text)
+    except json.JSONDecodeError as e:
+        # A bracket in leading prose ("[see below]") can be mistaken for the start of the
+        # JSON. Such a candidate has no quoted keys; retry after it.
+        if '"' in json_text:
+            return None, f"invalid JSON: {e}"
+        prose_end = text.find(json_text) + len(json_text)
+        return parse_structured_output(text[prose_end:], schema)
+
+    if schema is not None:
+        problems = validate(value, schema)
+        if problems:
+            return None, "; ".join(problems[:5])
+    return value, None
@@ -0,0 +1,42 @@
+# sat_gemini_agent/backend/src/bm25.py
+import math
+import re
+from collections import Counter, defaultdict
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """In-memory Okapi BM25 inverted index over a fixed list of texts."""
+
+    def __init__(self, texts: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(list)  # term -> [(text index, term frequency)]
+        self._lengths = []
+        for index, text in enumerate(texts):
+            tokens = tokenize(text)
+            self._lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self._postings[term].append((index, frequency))
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Returns up to k (text index, score) pairs with a positive score, best first."""
+        total = len(self._lengths)
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, frequency in postings:
+                length_norm = 1 - self.b + self.b * self._lengths[index] / self._average_length
+                scores[index] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
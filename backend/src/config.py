@@ -8,8 +8,15 @@ DATA_RAW_DIR = "data/raw"
 VECTOR_DB_DIR = "vector_db/chroma_db"
 
 # --- Embedding Model ---
-# For local models (e.g., from Hugging Face)
-EMBEDDING_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+# "local": quantized BGE-small run in-process on the CPU through ONNX Runtime (fastembed);
+#          no network calls, a few milliseconds per query embedding.
+# "api":   the hosted model named by EMBEDDING_MODEL_NAME below.
+# Vectors from different models are not comparable: re-run `python -m src.ingest` after switching.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "api")
+LOCAL_EMBEDDING_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0")) or None # None lets ONNX Runtime use every core
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64")) # Texts per inference batch
+
 # For OpenAI embeddings:
 # EMBEDDING_MODEL_NAME = "text-embedding-3-small"
 
@@ -18,6 +25,16 @@ EMBEDDING_MODEL_NAME = "models/embedding-001" # Or "models/text-embedding-004"
 # For Google Cloud Vertex AI embeddings (requires specific GCP setup):
 # EMBEDDING_MODEL_NAME = "text-embedding-preview-0409" # Example Vertex AI model
 
+# Each backend gets its own collection, since their vectors have different dimensions
+VECTOR_COLLECTION_NAME = "langchain"
+if EMBEDDING_BACKEND == "local":
+    EMBEDDING_MODEL_NAME = LOCAL_EMBEDDING_MODEL_NAME
+    VECTOR_COLLECTION_NAME = "langchain_local_bge_small"
+
+# Vectors are cached locally by (model name, sha256(text)) so unchanged text is never re-embedded
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "vector_db/embedding_cache.sqlite3")
+
 # --- LLM Model ---
 #LLM_MODEL_NAME = "models/gemini-2.5-flash-preview-05-20" # Or "gpt-3.5-turbo", "gemini-pro", "llama3", etc.
 
@@ -25,5 +42,21 @@ EMBEDDING_MODEL_NAME = "models/embedding-001" # Or "models/text-embedding-004"
 CHUNK_SIZE = 1000  # Characters per chunk
 CHUNK_OVERLAP = 200 # Overlap between chunks
 
+# --- Ingestion Parameters ---
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))  # Chunks per embedding call / upsert
+INGEST_EMBEDDING_WORKERS = int(os.getenv("INGEST_EMBEDDING_WORKERS", "4"))  # Embedding calls in flight at once
+
 # --- Retrieval Parameters ---
-TOP_K_RETRIEVAL = 5 # Number of relevant documents to retrieve
\ No newline at end of file
+TOP_K_RETRIEVAL = 5 # Number of relevant documents to retrieve
+# "similarity": plain vector search
+# "mmr":        vector search re-ranked by Maximal Marginal Relevance to drop near-duplicate chunks
+# "hybrid":     BM25 keyword scores blended with vector relevance scores
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "mmr")
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20")) # Candidates considered by mmr / hybrid before picking TOP_K_RETRIEVAL
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5")) # 1 = relevance only, 0 = diversity only
+HYBRID_BM25_WEIGHT = float(os.getenv("HYBRID_BM25_WEIGHT", "0.4")) # Share of the BM25 score in the hybrid score
+# Estimated tokens of retrieved context passed on to question generation; lower-ranked chunks past it are dropped
+RETRIEVAL_CONTEXT_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_CONTEXT_TOKEN_BUDGET", "1500"))
+# Retrieval results are cached per normalized query until they expire or the collection is re-ingested
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "256"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "3600"))
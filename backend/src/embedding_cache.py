@@ -0,0 +1,84 @@
+# sat_gemini_agent/backend/src/embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model with a SQLite cache of its vectors, keyed by
+    (model name, kind, sha256(text)). Documents and queries are cached separately
+    since some providers embed them differently (e.g. Google's task types).
+    Only texts missing from the cache are sent to the wrapped model.
+    """
+
+    def __init__(self, embedding_model: Embeddings, model_name: str, sqlite_path: str):
+        self.embedding_model = embedding_model
+        self.model_name = model_name
+        directory = os.path.dirname(sqlite_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS embedding_cache (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def _key(self, kind: str, text: str) -> str:
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{kind}:{text_hash}"
+
+    def _lookup(self, keys: list[str]) -> dict:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's limit on bound parameters per statement
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, blob in self._db.execute(f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})", batch):
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, vectors_by_key: dict):
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors_by_key.items()]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO embedding_cache (key, vector) VALUES (?, ?)", rows)
+            self._db.commit()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key("document", text) for text in texts]
+        cached = self._lookup(list(set(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing[key] = text
+        with self._lock:
+            self._stats["hits"] += len(texts) - len(missing)
+            self._stats["misses"] += len(missing)
+
+        if missing:
+            vectors = self.embedding_model.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing, vectors))
+            self._store(new_vectors)
+            cached.update(new_vectors)
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self._key("query", text)
+        cached = self._lookup([key])
+        with self._lock:
+            self._stats["hits" if key in cached else "misses"] += 1
+        if key in cached:
+            return cached[key]
+
+        vector = self.embedding_model.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
@@ -2,11 +2,37 @@
 from langchain_community.embeddings import HuggingFaceBgeEmbeddings
 from langchain_openai import OpenAIEmbeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from src.config import EMBEDDING_MODEL_NAME
+from src.config import EMBEDDING_MODEL_NAME, EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH, EMBEDDING_BACKEND, LOCAL_EMBEDDING_THREADS, LOCAL_EMBEDDING_BATCH_SIZE
+from src.embedding_cache import CachedEmbeddings
 import os
 
 def get_embedding_model():
+    """Returns the chosen embedding model, behind the local embedding cache unless it is disabled."""
+    embedding_model = _create_embedding_model()
+    if not EMBEDDING_CACHE_ENABLED:
+        return embedding_model
+    return CachedEmbeddings(embedding_model, EMBEDDING_MODEL_NAME, EMBEDDING_CACHE_PATH)
+
+def _create_local_embedding_model():
+    """In-process ONNX embedding model, warmed up so the first request doesn't pay for loading it."""
+    # Imported here so the API backends don't need fastembed installed
+    try:
+        import fastembed  # noqa: F401
+    except ImportError as e:
+        raise ImportError("EMBEDDING_BACKEND=local needs the fastembed package. Install it with: pip install -r requirements-local-embeddings.txt") from e
+    from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+    embedding_model = FastEmbedEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        threads=LOCAL_EMBEDDING_THREADS,
+        batch_size=LOCAL_EMBEDDING_BATCH_SIZE
+    )
+    embedding_model.embed_query("warm-up")
+    return embedding_model
+
+def _create_embedding_model():
     """Initializes and returns the chosen embedding model."""
+    if EMBEDDING_BACKEND == "local":
+        return _create_local_embedding_model()
     if "bge" in EMBEDDING_MODEL_NAME.lower() or "minilm" in EMBEDDING_MODEL_NAME.lower():
         return HuggingFaceBgeEmbeddings(model_name=EMBEDDING_MODEL_NAME)
     elif "text-embedding" in EMBEDDING_MODEL_NAME.lower() and "openai" in EMBEDDING_MODEL_NAME.lower():
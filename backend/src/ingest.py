@@ -0,0 +1,80 @@
+# sat_gemini_agent/backend/src/ingest.py
+#
+# Incremental ingestion of the SAT corpus into the Chroma vector store. Run from backend/:
+#   python -m src.ingest [--raw-dir data/raw] [--no-prune]
+#
+# Every chunk is stored under a hash of its source and content, so a re-run only embeds
+# chunks that are new or changed and deletes the ones whose text or source file is gone.
+import argparse
+import os
+import time
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.config import DATA_RAW_DIR, CHUNK_SIZE, CHUNK_OVERLAP, INGEST_BATCH_SIZE, INGEST_EMBEDDING_WORKERS
+from src.vector_store import get_vector_store, chunk_id, upsert_chunks, delete_chunks, mark_collection_changed
+
+TEXT_EXTENSIONS = {".txt", ".md"}
+
+def load_raw_documents(raw_dir: str = DATA_RAW_DIR) -> list[Document]:
+    """Loads every .txt, .md and .pdf file under raw_dir; `source` is the path relative to raw_dir."""
+    if not os.path.isdir(raw_dir):
+        raise FileNotFoundError(f"Raw data directory not found: {raw_dir}")
+
+    documents = []
+    for root, _, filenames in os.walk(raw_dir):
+        for filename in sorted(filenames):
+            path = os.path.join(root, filename)
+            source = os.path.relpath(path, raw_dir)
+            extension = os.path.splitext(filename)[1].lower()
+            if extension in TEXT_EXTENSIONS:
+                with open(path, encoding="utf-8") as f:
+                    documents.append(Document(page_content=f.read(), metadata={"source": source}))
+            elif extension == ".pdf":
+                from langchain_community.document_loaders import PyPDFLoader
+                for page in PyPDFLoader(path).load():
+                    page.metadata["source"] = source
+                    documents.append(page)
+    return documents
+
+def split_documents(documents: list[Document]) -> list[Document]:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return splitter.split_documents(documents)
+
+def ingest(raw_dir: str = DATA_RAW_DIR, prune: bool = True, batch_size: int = INGEST_BATCH_SIZE, max_workers: int = INGEST_EMBEDDING_WORKERS) -> dict:
+    """
+    Brings the vector store in line with raw_dir: adds new and changed chunks and, with
+    `prune`, deletes chunks that no longer occur in any source file.
+    """
+    started_at = time.monotonic()
+    chunks = split_documents(load_raw_documents(raw_dir))
+    current_ids = {chunk_id(chunk) for chunk in chunks}
+    print(f"Loaded {len(current_ids)} unique chunks from {raw_dir}.")
+
+    vector_store = get_vector_store()
+    existing_ids = set(vector_store._collection.get(include=[])["ids"])
+
+    added = upsert_chunks(vector_store, chunks, existing_ids=existing_ids, batch_size=batch_size, max_workers=max_workers)
+
+    stale_ids = existing_ids - current_ids if prune else set()
+    if stale_ids:
+        delete_chunks(vector_store, stale_ids, batch_size=batch_size)
+    if added or stale_ids:
+        mark_collection_changed()
+
+    stats = {
+        "added": added,
+        "deleted": len(stale_ids),
+        "unchanged": len(current_ids & existing_ids),
+        "seconds": round(time.monotonic() - started_at, 2),
+    }
+    print(f"Ingestion finished: {stats}")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally ingest raw SAT documents into the Chroma vector store.")
+    parser.add_argument("--raw-dir", default=DATA_RAW_DIR)
+    parser.add_argument("--no-prune", action="store_true", help="Keep chunks whose source text has changed or been removed.")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=INGEST_EMBEDDING_WORKERS, help="Embedding calls to run in parallel.")
+    args = parser.parse_args()
+    ingest(args.raw_dir, prune=not args.no_prune, batch_size=args.batch_size, max_workers=args.workers)
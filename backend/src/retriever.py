@@ -1,15 +1,165 @@
+import threading
+import time
+from collections import OrderedDict
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
-from src.vector_store import get_vector_store
-from src.config import TOP_K_RETRIEVAL
+from typing import Any, Optional
+from pydantic import PrivateAttr
+from src.bm25 import BM25Index
+from src.vector_store import get_vector_store, collection_version
+from src.config import (
+    TOP_K_RETRIEVAL,
+    RETRIEVAL_MODE,
+    RETRIEVAL_FETCH_K,
+    MMR_LAMBDA,
+    HYBRID_BM25_WEIGHT,
+    RETRIEVAL_CONTEXT_TOKEN_BUDGET,
+    RETRIEVAL_CACHE_MAX_ENTRIES,
+    RETRIEVAL_CACHE_TTL_SECONDS,
+)
+
+
+def _copy_documents(documents: list[Document]) -> list[Document]:
+    return [Document(page_content=doc.page_content, metadata=dict(doc.metadata)) for doc in documents]
+
+
+def _document_key(doc: Document):
+    return (doc.metadata.get("source"), doc.page_content)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Blends BM25 keyword scores over all chunk texts with vector relevance scores:
+    score = bm25_weight * bm25 + (1 - bm25_weight) * vector, over the `fetch_k` best
+    candidates of each search. Vector relevance scores are already in [0, 1]; BM25 scores
+    are divided by the best hit's. The BM25 index is built in memory from the collection
+    and rebuilt after ingestion changes it.
+    """
+    vector_store: Any
+    k: int
+    fetch_k: int = 20
+    bm25_weight: float = 0.4
+    _index: Optional[BM25Index] = PrivateAttr(default=None)
+    _documents: list = PrivateAttr(default_factory=list)
+    _version: object = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _bm25_index(self):
+        version = collection_version()
+        with self._lock:
+            if self._index is None or version != self._version:
+                contents = self.vector_store._collection.get(include=["documents", "metadatas"])
+                self._documents = [
+                    Document(page_content=text, metadata=metadata or {})
+                    for text, metadata in zip(contents["documents"], contents["metadatas"])
+                ]
+                self._index = BM25Index([doc.page_content for doc in self._documents])
+                self._version = version
+                print(f"Built BM25 index over {len(self._documents)} chunks.")
+            return self._index, self._documents
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        index, documents = self._bm25_index()
+        candidates = {}  # document key -> [document, vector score, bm25 score]
+
+        for doc, relevance in self.vector_store.similarity_search_with_relevance_scores(query, k=self.fetch_k):
+            candidates[_document_key(doc)] = [doc, relevance, 0.0]
+
+        bm25_hits = index.search(query, self.fetch_k)
+        top_bm25 = bm25_hits[0][1] if bm25_hits else 0.0
+        for position, bm25_score in bm25_hits:
+            doc = documents[position]
+            entry = candidates.setdefault(_document_key(doc), [doc, 0.0, 0.0])
+            entry[2] = bm25_score / top_bm25
+
+        ranked = sorted(
+            candidates.values(),
+            key=lambda entry: self.bm25_weight * entry[2] + (1 - self.bm25_weight) * entry[1],
+            reverse=True
+        )
+        return [doc for doc, _, _ in ranked[:self.k]]
+
+
+class ContextBudgetRetriever(BaseRetriever):
+    """
+    Keeps another retriever's documents, in rank order, while their estimated token count
+    fits in `token_budget`. The top document is always kept.
+    """
+    retriever: BaseRetriever
+    token_budget: int
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        kept = []
+        used_tokens = 0
+        for doc in documents:
+            # Rough estimate of ~4 characters per token
+            doc_tokens = len(doc.page_content) // 4
+            if kept and used_tokens + doc_tokens > self.token_budget:
+                break
+            kept.append(doc)
+            used_tokens += doc_tokens
+        return kept
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    LRU + TTL cache in front of another retriever, keyed by the normalized query and k.
+    The whole cache is dropped when ingestion changes the collection.
+    """
+    retriever: BaseRetriever
+    k: int
+    max_entries: int = 256
+    ttl_seconds: float = 3600
+    _entries: OrderedDict = PrivateAttr(default_factory=OrderedDict)  # key -> (expires_at, documents)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _version: object = PrivateAttr(default=None)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        key = (" ".join(query.lower().split()), self.k)
+        version = collection_version()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                return _copy_documents(entry[1])
+
+        documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, _copy_documents(documents))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return documents
+
 
 def get_retriever() -> BaseRetriever:
-    """Configures and returns the retriever."""
+    """Configures and returns the retriever for RETRIEVAL_MODE."""
     vector_store = get_vector_store()
-    # You can choose different search types: "similarity", "mmr" (Maximum Marginal Relevance)
-    # "mmr" tries to balance similarity with diversity, which can be useful.
-    retriever = vector_store.as_retriever(
-        search_type="similarity", # or "mmr"
-        search_kwargs={"k": TOP_K_RETRIEVAL}
+    if RETRIEVAL_MODE == "hybrid":
+        retriever = HybridRetriever(vector_store=vector_store, k=TOP_K_RETRIEVAL, fetch_k=RETRIEVAL_FETCH_K, bm25_weight=HYBRID_BM25_WEIGHT)
+    elif RETRIEVAL_MODE == "mmr":
+        # Maximal Marginal Relevance balances similarity with diversity, so near-duplicate chunks aren't all returned
+        retriever = vector_store.as_retriever(
+            search_type="mmr",
+            search_kwargs={"k": TOP_K_RETRIEVAL, "fetch_k": RETRIEVAL_FETCH_K, "lambda_mult": MMR_LAMBDA}
+        )
+    elif RETRIEVAL_MODE == "similarity":
+        retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": TOP_K_RETRIEVAL})
+    else:
+        raise ValueError(f"Unsupported retrieval mode: {RETRIEVAL_MODE}")
+    print(f"Retriever configured to fetch {TOP_K_RETRIEVAL} documents ({RETRIEVAL_MODE}, context budget {RETRIEVAL_CONTEXT_TOKEN_BUDGET} tokens).")
+
+    if RETRIEVAL_CONTEXT_TOKEN_BUDGET > 0:
+        retriever = ContextBudgetRetriever(retriever=retriever, token_budget=RETRIEVAL_CONTEXT_TOKEN_BUDGET)
+    return CachedRetriever(
+        retriever=retriever,
+        k=TOP_K_RETRIEVAL,
+        max_entries=RETRIEVAL_CACHE_MAX_ENTRIES,
+        ttl_seconds=RETRIEVAL_CACHE_TTL_SECONDS
     )
-    print(f"Retriever configured to fetch {TOP_K_RETRIEVAL} documents.")
-    return retriever
\ No newline at end of file
@@ -1,9 +1,12 @@
 # sat_gemini_agent/backend/src/vector_store.py
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
-from src.config import VECTOR_DB_DIR
+from src.config import VECTOR_DB_DIR, VECTOR_COLLECTION_NAME, EMBEDDING_MODEL_NAME, INGEST_BATCH_SIZE, INGEST_EMBEDDING_WORKERS
 from src.embedding_model import get_embedding_model
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import os # Import os to check directory existence
+import time
 
 def get_vector_store():
     """Initializes and returns the Chroma vector store."""
@@ -13,6 +16,7 @@ def get_vector_store():
     if os.path.exists(VECTOR_DB_DIR) and len(os.listdir(VECTOR_DB_DIR)) > 0:
         print(f"Loading existing ChromaDB from: {VECTOR_DB_DIR}")
         vector_store = Chroma(
+            collection_name=VECTOR_COLLECTION_NAME,
             persist_directory=VECTOR_DB_DIR,
             embedding_function=embedding_model
         )
@@ -24,6 +28,7 @@ def get_vector_store():
     else:
         print(f"ChromaDB directory not found or is empty at: {VECTOR_DB_DIR}. Initializing new ChromaDB.")
         vector_store = Chroma(
+            collection_name=VECTOR_COLLECTION_NAME,
             persist_directory=VECTOR_DB_DIR,
             embedding_function=embedding_model
         )
@@ -31,15 +36,75 @@ def get_vector_store():
 
     return vector_store
 
+# Rewritten whenever ingestion changes the collection, so caches of retrieval results
+# (including ones in other processes) can tell that they are stale
+INGEST_VERSION_PATH = os.path.join(VECTOR_DB_DIR, "ingest_version")
+
+def collection_version():
+    """Identifies the current contents of the collection; None if it was never ingested into."""
+    try:
+        return os.stat(INGEST_VERSION_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def mark_collection_changed():
+    os.makedirs(VECTOR_DB_DIR, exist_ok=True)
+    with open(INGEST_VERSION_PATH, "w") as f:
+        f.write(str(time.time_ns()))
+
+def chunk_id(chunk: Document) -> str:
+    """
+    Hash of the embedding model, the chunk's source and its content: an unchanged chunk keeps
+    its ID across ingests, and switching models re-embeds everything.
+    """
+    key = f"{EMBEDDING_MODEL_NAME}\n{chunk.metadata.get('source', '')}\n{chunk.page_content}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def _batches(items: list, batch_size: int):
+    return [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+
+def upsert_chunks(vector_store, chunks: list[Document], existing_ids: set = None, batch_size: int = INGEST_BATCH_SIZE, max_workers: int = INGEST_EMBEDDING_WORKERS) -> int:
+    """
+    Embeds and stores the chunks whose IDs are not in the store yet, in batches with up
+    to `max_workers` embedding calls in flight. Returns the number of chunks added.
+    `existing_ids` saves a lookup when the caller has already listed the collection.
+    """
+    chunks_by_id = {chunk_id(chunk): chunk for chunk in chunks}
+    if existing_ids is None:
+        existing_ids = set()
+        for batch_ids in _batches(list(chunks_by_id), batch_size):
+            existing_ids.update(vector_store._collection.get(ids=batch_ids, include=[])["ids"])
+    new_ids = [id_ for id_ in chunks_by_id if id_ not in existing_ids]
+    if not new_ids:
+        return 0
+
+    embedding_model = vector_store.embeddings
+    def embed(batch_ids):
+        return embedding_model.embed_documents([chunks_by_id[id_].page_content for id_ in batch_ids])
+
+    batches = _batches(new_ids, batch_size)
+    added = 0
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embed") as executor:
+        # Batches are written as their embeddings arrive, so an interrupted run keeps its progress
+        for batch_ids, embeddings in zip(batches, executor.map(embed, batches)):
+            vector_store._collection.upsert(
+                ids=batch_ids,
+                embeddings=embeddings,
+                documents=[chunks_by_id[id_].page_content for id_ in batch_ids],
+                metadatas=[chunks_by_id[id_].metadata for id_ in batch_ids]
+            )
+            added += len(batch_ids)
+            print(f"Upserted {added}/{len(new_ids)} new chunks.")
+    return added
+
+def delete_chunks(vector_store, ids: list[str], batch_size: int = INGEST_BATCH_SIZE):
+    for batch_ids in _batches(list(ids), batch_size):
+        vector_store._collection.delete(ids=batch_ids)
+
 def add_documents_to_vector_store(chunks: list[Document]):
-    """Adds a list of LangChain Documents (chunks) to the vector store."""
+    """Adds the chunks that are not in the vector store yet (see upsert_chunks)."""
     vector_store = get_vector_store()
-    # Check if chunks are already in the store (simple check based on count)
-    # A more robust check might involve comparing chunk IDs or hashes
-    if vector_store._collection.count() == 0:
-        print(f"Adding {len(chunks)} chunks to the vector store...")
-        vector_store.add_documents(chunks)
-        print("Documents added successfully.")
-    else:
-        print(f"Vector store already contains {vector_store._collection.count()} documents. Skipping addition.")
-        print("To re-ingest, delete the 'vector_db/chroma_db' directory and run ingest.py again.")
\ No newline at end of file
+    added = upsert_chunks(vector_store, chunks)
+    if added:
+        mark_collection_changed()
+    print(f"Added {added} new chunks; {len(chunks) - added} were already in the vector store.")
@@ -4,6 +4,7 @@ import React, { useState, useEffect } from 'react'; // Removed useRef
 import {
   generateQuestion,
   evaluateAnswer,
+  explainAnswer,
   getStudyPlan,
   getPerformanceSummary,
   uploadImageQuestion,
@@ -281,6 +282,11 @@ function App() {
   };
 
 
+  const correctAnswerInfo = () => ({
+    answer: parsedQuestion.correctAnswer,
+    explanation: parsedQuestion.explanation,
+  });
+
   const handleSubmitAnswer = async () => {
     if (!currentUserId) {
       alert("Please log in or register a user before submitting answers.");
@@ -295,19 +301,21 @@ function App() {
     const timeTakenSeconds = Math.round((Date.now() - startTime) / 1000);
 
     try {
-      const correct_answer_info = {
-        answer: parsedQuestion.correctAnswer,
-        explanation: parsedQuestion.explanation,
-      };
+      // Multiple-choice answers are graded by the backend without a model call when it gets the options
+      const options = parsedQuestion.options
+        ? Object.entries(parsedQuestion.options).map(([letter, text]) => `${letter}) ${text}`)
+        : null;
 
       const feedbackData = await evaluateAnswer(
         questionText,
         userAnswer,
-        correct_answer_info,
+        correctAnswerInfo(),
         currentTopic,
         currentDifficulty,
         timeTakenSeconds,
-        currentUserId
+        currentUserId,
+        options ? 'multiple_choice' : undefined,
+        options
       );
       setFeedback(feedbackData.feedback);
 
@@ -319,6 +327,20 @@ function App() {
     }
   };
 
+  // Fetches the full AI explanation for an answer that was graded locally
+  const handleExplainAnswer = async () => {
+    setLoading(true);
+    try {
+      const explanationData = await explainAnswer(questionText, userAnswer, correctAnswerInfo());
+      setFeedback({ ...explanationData.feedback, is_correct: feedback.is_correct });
+    } catch (error) {
+      console.error("Error explaining answer:", error);
+      alert(`Failed to get an explanation: ${error.message}. Please try again.`);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const handleGetStudyPlan = async () => {
     if (!currentUserId) {
       alert("Please log in or register a user to get a study plan.");
@@ -636,6 +658,7 @@ function App() {
         <FeedbackDisplay
           feedback={feedback}
           onNextQuestion={() => fetchNewQuestion(currentTopic, currentDifficulty)}
+          onExplainAnswer={handleExplainAnswer}
           loading={loading}
         />
       )}
@@ -1,7 +1,7 @@
 // frontend/src/components/ChatInterface.js
 
 import React, { useState, useEffect, useRef } from 'react';
-import { startChatSession, sendChatMessage } from '../services/api'; // Adjust path if needed
+import { startChatSession, sendChatMessageStream } from '../services/api'; // Adjust path if needed
 import './ChatInterface.css'; // We'll create this file next
 
 function ChatInterface({ userId, userProfile, onClose }) {
@@ -45,23 +45,22 @@ function ChatInterface({ userId, userProfile, onClose }) {
     setCurrentMessage('');
     setLoading(true);
 
+    // Add an empty tutor message and grow it as streamed text arrives
+    setChatHistory((prevHistory) => [...prevHistory, { sender: 'AI Tutor', text: '' }]);
+
     try {
-      const response = await sendChatMessage(userId, userMsg.text);
-      if (response.ai_response) {
-        setChatHistory((prevHistory) => [
-          ...prevHistory,
-          { sender: 'AI Tutor', text: response.ai_response },
-        ]);
-      } else if (response.error) {
-        setChatHistory((prevHistory) => [
-          ...prevHistory,
-          { sender: 'AI Tutor', text: `Error: ${response.error} ${response.details || ''}` },
-        ]);
-      }
+      await sendChatMessageStream(userId, userMsg.text, (chunk) => {
+        setChatHistory((prevHistory) => {
+          const updatedHistory = [...prevHistory];
+          const lastMessage = updatedHistory[updatedHistory.length - 1];
+          updatedHistory[updatedHistory.length - 1] = { ...lastMessage, text: lastMessage.text + chunk };
+          return updatedHistory;
+        });
+      });
     } catch (error) {
       console.error("Error sending message:", error);
       setChatHistory((prevHistory) => [
-        ...prevHistory,
+        ...prevHistory.filter((msg, index) => !(index === prevHistory.length - 1 && msg.sender === 'AI Tutor' && !msg.text)),
         { sender: 'System Error', text: `Failed to send message: ${error.message}` },
       ]);
     } finally {
@@ -2,7 +2,7 @@
 
 import React from 'react';
 
-function FeedbackDisplay({ feedback, onNextQuestion, loading }) {
+function FeedbackDisplay({ feedback, onNextQuestion, onExplainAnswer, loading }) {
   if (!feedback) {
     return null;
   }
@@ -79,6 +79,13 @@ function FeedbackDisplay({ feedback, onNextQuestion, loading }) {
         <p>{feedback}</p>
       )}
 
+      {/* Locally graded multiple-choice answers come without the AI analysis; it is fetched on request */}
+      {isJsonFeedback && feedback.detailed_feedback_available && onExplainAnswer && (
+        <button onClick={onExplainAnswer} disabled={loading}>
+          {loading ? 'Loading...' : 'Explain This Answer'}
+        </button>
+      )}
+
       <button onClick={onNextQuestion} disabled={loading}>
         {loading ? 'Loading...' : 'Next Question'}
       </button>
@@ -323,7 +323,9 @@ export const generateQuestionFromDatabase = async (queryTopic, difficulty, quest
   }
 };
 
-export const evaluateAnswer = async (questionText, userAnswer, correct_answer_info, topic, difficulty, timeTakenSeconds, userId) => {
+// questionType and options (e.g. ["A) 3", "B) 5"]) let the backend grade multiple-choice answers
+// against the answer key without a model call; the AI explanation is then fetched with explainAnswer.
+export const evaluateAnswer = async (questionText, userAnswer, correct_answer_info, topic, difficulty, timeTakenSeconds, userId, questionType, options) => {
   try {
     const response = await fetch(`${API_BASE_URL}/evaluate_answer`, {
       method: 'POST',
@@ -335,7 +337,9 @@ export const evaluateAnswer = async (questionText, userAnswer, correct_answer_in
         topic,
         difficulty,
         timeTakenSeconds,
-        user_id: userId
+        user_id: userId,
+        question_type: questionType,
+        options
       })
     });
     if (!response.ok) {
@@ -349,6 +353,28 @@ export const evaluateAnswer = async (questionText, userAnswer, correct_answer_in
   }
 };
 
+export const explainAnswer = async (questionText, userAnswer, correct_answer_info) => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/explain_answer`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        question_text: questionText,
+        user_answer: userAnswer,
+        correct_answer_info
+      })
+    });
+    if (!response.ok) {
+      const errorData = await response.json();
+      throw new Error(errorData.error || 'Failed to explain answer');
+    }
+    return response.json();
+  } catch (error) {
+    console.error("API Error - explainAnswer:", error);
+    throw error;
+  }
+};
+
 export const getStudyPlan = async (user_performance_data, userId) => {
   try {
     const response = await fetch(`${API_BASE_URL}/study_plan`, {
@@ -517,6 +543,56 @@ export const sendChatMessage = async (userId, message) => {
   }
 };
 
+// Streams the tutor's reply from /chat/send_message_stream (Server-Sent Events).
+// onChunk is called with each piece of text as it arrives; resolves with { ai_response } once the reply is complete.
+export const sendChatMessageStream = async (userId, message, onChunk) => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/chat/send_message_stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ user_id: userId, message: message })
+    });
+    if (!response.ok) {
+      const errorData = await response.json();
+      throw new Error(errorData.error || 'Failed to send chat message');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let fullText = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      const rawEvents = buffer.split('\n\n');
+      buffer = rawEvents.pop();
+      for (const rawEvent of rawEvents) {
+        let eventName = 'message';
+        let eventData = '';
+        for (const line of rawEvent.split('\n')) {
+          if (line.startsWith('event: ')) eventName = line.slice(7);
+          else if (line.startsWith('data: ')) eventData += line.slice(6);
+        }
+        const payload = eventData ? JSON.parse(eventData) : {};
+        if (eventName === 'chunk') {
+          fullText += payload.text;
+          onChunk(payload.text);
+        } else if (eventName === 'done') {
+          fullText = payload.ai_response;
+        } else if (eventName === 'error') {
+          throw new Error(payload.error || 'Failed to get AI response');
+        }
+      }
+    }
+    return { ai_response: fullText };
+  } catch (error) {
+    console.error("API Error - sendChatMessageStream:", error);
+    throw error;
+  }
+};
+
 // NEW API FUNCTION: Get User Achievements
 export const getUserAchievements = async (userId) => {
   try {